@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# Offline benchmarks for bot.py / rmp_helper.py: a local stand-in for the RMP GraphQL
+# endpoint, a fake Discord channel/interaction layer, and a few scenarios timed against
+# the real command and poller code. No token or network needed.
+#
+#   python bench.py                       # default sizes
+#   python bench.py --channels 40 --reviews 5 --json > bench_output.txt
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from aiohttp import web
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- Fake RMP GraphQL server ---
+
+def decode_teacher_id(b64_id):
+    return int(base64.b64decode(b64_id).decode('ascii').split("-", 1)[1])
+
+class FakeRMP:
+    """Serves the queries rmp_helper sends, with fixed latency and comment size."""
+
+    def __init__(self, reviews_per_professor, latency, comment_size):
+        self.reviews_per_professor = reviews_per_professor
+        self.latency = latency
+        self.comment_size = comment_size
+        self.requests = 0
+        self.bytes_sent = 0
+        self._reviews = {}
+        self._runner = None
+        self.url = None
+
+    def teacher(self, professor_id):
+        return {
+            "firstName": "Prof", "lastName": str(professor_id), "department": "Bench",
+            "avgRating": 3.5, "avgDifficulty": 3.0, "numRatings": self.reviews_per_professor,
+            "wouldTakeAgainPercent": 50, "school": {"name": "Bench University", "id": "U2Nob29sLTE="}
+        }
+
+    def reviews(self, professor_id):
+        """Newest first; dates one hour apart so everything falls in /mynewsanrr's 5-day window."""
+        if professor_id not in self._reviews:
+            now = datetime.now(timezone.utc)
+            self._reviews[professor_id] = [{
+                "id": base64.b64encode(f"Rating-{professor_id}{n:06d}".encode()).decode(),
+                "comment": "x" * self.comment_size,
+                "date": (now - timedelta(hours=n)).strftime("%Y-%m-%d %H:%M:%S +0000 UTC"),
+                "class": "BENCH101", "helpfulRating": 4, "difficultyRating": 3,
+                "attendanceMandatory": "mandatory", "wouldTakeAgain": 1, "grade": "A",
+                "isForOnlineClass": False, "isForCredit": True, "ratingTags": "Tough grader--Caring",
+                "thumbsUpTotal": 0, "thumbsDownTotal": 0, "textbookUse": 3
+            } for n in range(self.reviews_per_professor)]
+        return self._reviews[professor_id]
+
+    def page(self, professor_id, count, cursor):
+        offset = int(cursor) if cursor else 0
+        reviews = self.reviews(professor_id)[offset:offset + count]
+        end = offset + len(reviews)
+        return {
+            "edges": [{"node": review} for review in reviews],
+            "pageInfo": {"hasNextPage": end < self.reviews_per_professor, "endCursor": str(end)}
+        }
+
+    async def handle(self, request):
+        body = await request.json()
+        query, variables = body["query"], body["variables"]
+        await asyncio.sleep(self.latency)
+
+        if query.startswith("query WatchProbeQuery") or query.startswith("query WatchPageQuery"):
+            data = {}
+            i = 0
+            while f"id{i}" in variables:
+                pid = decode_teacher_id(variables[f"id{i}"])
+                if query.startswith("query WatchProbeQuery"):
+                    data[f"p{i}"] = self.teacher(pid)
+                else:
+                    data[f"p{i}"] = {"ratings": self.page(pid, variables["count"], variables.get(f"cursor{i}"))}
+                i += 1
+        elif "ratings(" in query:
+            pid = decode_teacher_id(variables["id"])
+            data = {"node": {"ratings": self.page(pid, variables["count"], variables.get("cursor"))}}
+        else:
+            data = {"node": self.teacher(decode_teacher_id(variables["id"]))}
+
+        payload = json.dumps({"data": data})
+        self.requests += 1
+        self.bytes_sent += len(payload)
+        return web.Response(text=payload, content_type="application/json")
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/graphql", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/graphql"
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+# --- Fake Discord layer ---
+
+class FakeChannel:
+    def __init__(self, channel_id, send_latency):
+        self.id = channel_id
+        self.name = f"bench-{channel_id}"
+        self.send_latency = send_latency
+        self.sent = 0
+
+    async def send(self, content=None, embed=None):
+        await asyncio.sleep(self.send_latency)
+        self.sent += 1
+
+    async def history(self, limit=100):
+        return
+        yield
+
+class FakeUser:
+    id = 0
+    name = "bench-user"
+
+class FakeResponse:
+    async def send_message(self, content=None, **kwargs):
+        pass
+
+    async def defer(self, **kwargs):
+        pass
+
+class FakeFollowup:
+    async def send(self, content=None, **kwargs):
+        pass
+
+class FakeInteraction:
+    def __init__(self, channel):
+        self.channel = channel
+        self.channel_id = channel.id
+        self.guild_id = None
+        self.user = FakeUser()
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+        self.extras = {}
+
+# --- Scenarios ---
+
+async def reset_rmp_state(raalmbot, fake):
+    client = raalmbot.get_rmp_client()
+    client.url = fake.url
+    client.cache = type(client.cache)()
+    raalmbot.seen_store._seen.clear()
+    await raalmbot.subscription_store.set_high_water({pid: None for pid in raalmbot.watched_professors()})
+    raalmbot.review_renderer._cache.clear()
+
+async def bench_wsnd(raalmbot, args, fake):
+    channel = FakeChannel(1, 0)
+    started = time.perf_counter()
+    for _ in range(args.wsnd_calls):
+        await raalmbot.wsnd.callback(FakeInteraction(channel))
+    elapsed = time.perf_counter() - started
+    await raalmbot.log_store.flush()
+    return {"seconds": elapsed, "ops_per_sec": args.wsnd_calls / elapsed}
+
+async def subscribe_channels(raalmbot, args):
+    """--channels fake channels, each following --professors professors."""
+    channels = {cid: FakeChannel(cid, args.send_latency_ms / 1000) for cid in range(1000, 1000 + args.channels)}
+    store = raalmbot.subscription_store
+    for channel_id in store.channel_ids():
+        await store.remove(channel_id)
+    for channel_id in channels:
+        for n in range(args.professors):
+            await store.add(channel_id, raalmbot.PROFESSOR_ID + n)
+    raalmbot.bot.get_channel = channels.get
+    return channels
+
+async def bench_poll(raalmbot, args, fake):
+    channels = await subscribe_channels(raalmbot, args)
+    await reset_rmp_state(raalmbot, fake)
+
+    requests_before, bytes_before = fake.requests, fake.bytes_sent
+    started = time.perf_counter()
+    await raalmbot.check_rmp_updates()
+    elapsed = time.perf_counter() - started
+
+    # A second poll with nothing new shows the cost of an idle cycle
+    raalmbot.rmp_client.cache = type(raalmbot.rmp_client.cache)()
+    idle_before = fake.requests
+    idle_started = time.perf_counter()
+    await raalmbot.check_rmp_updates()
+    idle_elapsed = time.perf_counter() - idle_started
+
+    return {
+        "seconds": elapsed,
+        "messages": sum(ch.sent for ch in channels.values()),
+        "rmp_requests": idle_before - requests_before,
+        "rmp_bytes": fake.bytes_sent - bytes_before,
+        "idle_seconds": idle_elapsed,
+        "idle_rmp_requests": fake.requests - idle_before
+    }
+
+async def bench_mynewsanrr(raalmbot, args, fake):
+    channel = FakeChannel(2000 + random.randrange(10 ** 6), args.send_latency_ms / 1000)
+    await reset_rmp_state(raalmbot, fake)
+
+    # Half of the recent reviews are already in the channel's ledger
+    reviews = fake.reviews(raalmbot.PROFESSOR_ID)
+    await raalmbot.review_ledger.backfill(channel.id, [r["id"] for r in reviews[::2]])
+
+    started = time.perf_counter()
+    await raalmbot.my_new_sanrr.callback(FakeInteraction(channel))
+    return {"seconds": time.perf_counter() - started, "messages": channel.sent}
+
+async def bench_botlog(raalmbot, args, fake):
+    store = raalmbot.log_store
+    missing = args.log_entries - store._conn.execute("SELECT COUNT(*) FROM message_logs").fetchone()[0]
+    if missing > 0:
+        store._write([{
+            "timestamp": datetime.now().isoformat(), "content": f"bench entry {n}",
+            "channel": "bench", "requester": "bench-user"
+        } for n in range(missing)])
+
+    channel = FakeChannel(3, 0)
+    started = time.perf_counter()
+    for _ in range(args.botlog_calls):
+        await raalmbot.bot_log.callback(FakeInteraction(channel))
+    elapsed = time.perf_counter() - started
+    return {"seconds": elapsed, "per_call_ms": elapsed / args.botlog_calls * 1000}
+
+async def bench_wsnd_during_poll(raalmbot, args, fake):
+    """/wsnd latency while a slow poll is in flight; should stay flat if nothing blocks the loop."""
+    channel = FakeChannel(4, 0)
+    latencies = []
+    await subscribe_channels(raalmbot, args)
+    await reset_rmp_state(raalmbot, fake)
+    poll = asyncio.create_task(raalmbot.check_rmp_updates())
+    while not poll.done():
+        started = time.perf_counter()
+        await raalmbot.wsnd.callback(FakeInteraction(channel))
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.01)
+    await poll
+    return {"seconds": statistics.median(latencies), "max_ms": max(latencies) * 1000, "samples": len(latencies)}
+
+SCENARIOS = {
+    "wsnd": bench_wsnd,
+    "check_rmp_updates": bench_poll,
+    "mynewsanrr": bench_mynewsanrr,
+    "botlog": bench_botlog,
+    "wsnd_during_poll": bench_wsnd_during_poll,
+}
+
+async def run(args):
+    fake = FakeRMP(args.reviews, args.latency_ms / 1000, args.comment_size)
+    await fake.start()
+
+    # bot.py keeps its state in the working directory, so give it a scratch one
+    workdir = tempfile.mkdtemp(prefix="raalmbot-bench-")
+    for name in ("responses.json", "fortunes.json"):
+        shutil.copy(os.path.join(REPO_DIR, name), workdir)
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+    import bot as raalmbot
+    logging.getLogger().setLevel(logging.WARNING)
+
+    async def ready():
+        pass
+    raalmbot.bot.wait_until_ready = ready
+    # Measure the draw path itself, not the rate limiter turning the bench user away
+    raalmbot.draw_limits = raalmbot.DrawLimits()
+    # Full-history backfills would add their own RMP traffic to the poll numbers
+    async def no_backfills(details):
+        pass
+    raalmbot.schedule_history_backfills = no_backfills
+
+    results = {}
+    try:
+        for name in args.scenarios:
+            runs = [await SCENARIOS[name](raalmbot, args, fake) for _ in range(args.repeat)]
+            seconds = [r["seconds"] for r in runs]
+            summary = {"median_s": statistics.median(seconds), "min_s": min(seconds)}
+            # Extra counters come from the median run
+            median_run = sorted(runs, key=lambda r: r["seconds"])[len(runs) // 2]
+            summary.update({k: v for k, v in median_run.items() if k != "seconds"})
+            results[name] = summary
+    finally:
+        if raalmbot.rmp_client is not None:
+            await raalmbot.rmp_client.close()
+        await raalmbot.log_store.close()
+        await fake.stop()
+        os.chdir(REPO_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline RaalmBot benchmarks")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--channels", type=int, default=40)
+    parser.add_argument("--professors", type=int, default=1, help="professors each channel follows")
+    parser.add_argument("--reviews", type=int, default=5, help="reviews per professor on the fake server")
+    parser.add_argument("--latency-ms", type=float, default=50, help="fake RMP response latency")
+    parser.add_argument("--comment-size", type=int, default=500, help="characters per review comment")
+    parser.add_argument("--send-latency-ms", type=float, default=20, help="fake Discord send latency")
+    parser.add_argument("--wsnd-calls", type=int, default=2000)
+    parser.add_argument("--log-entries", type=int, default=100000)
+    parser.add_argument("--botlog-calls", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    results = asyncio.run(run(args))
+
+    if args.json:
+        print(json.dumps({"args": vars(args), "results": results}, indent=2))
+        return
+    for name, summary in results.items():
+        extras = ", ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in summary.items())
+        print(f"{name:<20} {extras}")
+
+if __name__ == "__main__":
+    main()
@@ -1,228 +1,639 @@
 #!/usr/bin/env python3
+import time
+STARTUP_STARTED = time.perf_counter() # Startup phase timings are measured from here
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
-import random
-import json
 import os
 import asyncio
+import hashlib
+import json
 import logging
+import math
+import metrics
 from dotenv import load_dotenv
-from rmp_helper import RMPHelper
-from datetime import datetime, timedelta, timezone
+from log_store import LogStore, WRITE_SECONDS as LOG_WRITE_SECONDS
+from response_pool import ResponsePool
+from review_ledger import ReviewLedger
+from seen_store import SeenStore
+from delivery import DeliveryScheduler, DELIVERY_SECONDS
+from config_store import ConfigStore
+from review_render import ReviewRenderer, field_value
+from poll_scheduler import AdaptivePollScheduler
+from subscription_store import SubscriptionStore
+from leader import LeaderLease
+from draw_limits import DrawLimits, DEFAULT_DRAW_LIMITS
+from review_archive import ReviewArchive
+from datetime import datetime
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Seconds spent in each startup phase, reported once the gateway is ready
+startup_phases = {}
+_last_startup_mark = STARTUP_STARTED
+
+def mark_startup(phase):
+    """Records the time since the previous mark as `phase`."""
+    global _last_startup_mark
+    now = time.perf_counter()
+    startup_phases[phase] = now - _last_startup_mark
+    _last_startup_mark = now
+
+mark_startup("imports")
+
 # 1. Load .env
 load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
+METRICS_PORT = os.getenv('METRICS_PORT') # Optional: serve /metrics on localhost
+# Optional sharding across processes: every process gets the same SHARD_COUNT and its own
+# SHARD_IDS (e.g. "0,1"). All processes share DB_FILE; one of them is elected to poll RMP.
+SHARD_COUNT = os.getenv('SHARD_COUNT')
+SHARD_IDS = os.getenv('SHARD_IDS')
 
 # 2. Intents
 intents = discord.Intents.default()
 intents.message_content = True 
 
-bot = commands.Bot(command_prefix="!", intents=intents)
-
 # RMP Constants
 PROFESSOR_ID = 2635703
 CONFIG_FILE = 'config.json'
-LOG_FILE = 'message_logs.json'
-
-# Initialize RMP Helper
-rmp_helper = RMPHelper(PROFESSOR_ID)
+CONFIG_SAVE_DELAY = 2 # Seconds of quiet before a batch of config changes is written
+DB_FILE = 'raalmbot.db'
+LEGACY_LOG_FILE = 'message_logs.json'
+LOG_RETENTION = 1_000_000
+LOG_PAGE_SIZE = 20
+DELIVERY_CONCURRENCY = 10 # Channels sent to in parallel
+LEDGER_BACKFILL_LIMIT = 1000 # Messages scanned once per channel to seed the ledger (0 disables)
+RMP_TIMEOUT = 15 # Seconds per GraphQL request
+RMP_MAX_CONCURRENCY = 4
+RMP_BATCH_SIZE = 10 # Professors per aliased GraphQL request
+SEEN_REVIEWS_PER_PROFESSOR = 20000
+RMP_PAGE_SIZE = 5 # Reviews per page when catching up on a professor
+RMP_MAX_PAGES = 4
+DAY = 24 * 60 * 60
+# Adaptive polling (seconds): new reviews -> min, quiet or failing -> back off towards max
+POLL_MIN_INTERVAL = 2 * 60
+POLL_BASE_INTERVAL = 10 * 60
+POLL_MAX_INTERVAL = 2 * 60 * 60
+POLLER_LEASE_TTL = 60 # A crashed poller is replaced after this many seconds
+POLLER_LEASE_RENEW = 15
+HISTORY_PAGE_SIZE = 50 # Reviews per page when backfilling a professor's full history (stats and archive)
+HISTORY_MAX_PAGES = 200
+CATCHUP_PAGE_SIZE = 20 # Reviews per page when catching up after the poller was down
+CATCHUP_MAX_PAGES = 50
+
+# RMP client and helpers (all helpers share one connection pool); created on first use by
+# get_rmp_client() so rmp_helper isn't imported on the startup path
+rmp_client = None
+rmp_watcher = None
+rmp_helpers = {}
+
+# Message log (append-only, written off the event loop)
+log_store = LogStore(DB_FILE, retention=LOG_RETENTION)
+log_store.import_json(LEGACY_LOG_FILE)
+
+# Reviews already posted per channel, so /mynewsanrr doesn't need to scan history
+review_ledger = ReviewLedger(DB_FILE)
+
+# Review embeds, built once per review
+review_renderer = ReviewRenderer()
+
+# Parallel, retrying fan-out of review embeds to channels
+delivery = DeliveryScheduler(max_concurrency=DELIVERY_CONCURRENCY)
+
+# When each watched professor is polled next
+poll_scheduler = AdaptivePollScheduler(
+    min_interval=POLL_MIN_INTERVAL, base_interval=POLL_BASE_INTERVAL, max_interval=POLL_MAX_INTERVAL
+)
+rmp_poll_task = None
+
+# Subscriptions and numRatings marks, shared with any other bot processes
+subscription_store = SubscriptionStore(DB_FILE)
+
+# Only the process holding this lease runs the RMP poller
+poller_lease = LeaderLease(DB_FILE, "rmp_poller", ttl=POLLER_LEASE_TTL, renew_interval=POLLER_LEASE_RENEW)
+
+# Review IDs the poller has already handled, per professor
+seen_store = SeenStore(DB_FILE, max_per_professor=SEEN_REVIEWS_PER_PROFESSOR)
+
+# Columnar review history and precomputed aggregates behind /sanrrstats; loaded (with
+# NumPy) by get_review_stats() on first use
+review_stats = None
+review_stats_unavailable = False # Set when NumPy can't be imported; /sanrrstats is then off
+history_backfills = {} # professor_id -> task paging that professor's full history
+
+# Every review fetched from RMP; serves /mynewsanrr and the catch-up after downtime
+review_archive = ReviewArchive(DB_FILE)
+
+# Metrics
+COMMAND_SECONDS = metrics.histogram("command_latency_seconds", "Slash command handling time")
+COMMAND_ERRORS = metrics.counter("command_errors_total", "Slash commands that raised")
+POLL_SECONDS = metrics.histogram("rmp_poll_seconds", "Duration of one check_rmp_updates run")
+DRAW_COMMANDS = metrics.counter("draw_commands_total", "Random-draw commands by outcome (served / throttled)")
+STARTUP_SECONDS = metrics.gauge("startup_phase_seconds", "Time spent in each startup phase")
+
+mark_startup("stores")
+
+class TimedCommandTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction):
+        interaction.extras["started"] = time.perf_counter()
+        return True
+
+    async def on_error(self, interaction, error):
+        name = interaction.command.name if interaction.command else "unknown"
+        COMMAND_ERRORS.inc(command=name)
+        if "started" in interaction.extras:
+            COMMAND_SECONDS.observe(time.perf_counter() - interaction.extras["started"], command=name)
+        await super().on_error(interaction, error)
+
+if SHARD_COUNT:
+    BotBase = commands.AutoShardedBot
+    shard_options = {"shard_count": int(SHARD_COUNT)}
+    if SHARD_IDS:
+        shard_options["shard_ids"] = [int(shard_id) for shard_id in SHARD_IDS.split(",")]
+else:
+    BotBase = commands.Bot
+    shard_options = {}
+
+class RaalmBot(BotBase):
+    async def setup_hook(self):
+        mark_startup("login")
+        load_config()
+        mark_startup("config")
+        log_store.start()
+        poller_lease.start()
+        self.loop_lag_task = asyncio.create_task(metrics.monitor_loop_lag())
+        if METRICS_PORT:
+            await metrics.start_http_server(int(METRICS_PORT))
+        # Runs alongside the gateway connection instead of delaying it
+        self.command_sync_task = asyncio.create_task(sync_commands_if_changed())
+        mark_startup("setup_hook")
+
+    async def close(self):
+        # Stop polling before anything it writes to is closed, and hand the lease over only
+        # once our seen IDs are saved, so the next poller doesn't post them again
+        tasks = [task for task in (rmp_poll_task, *history_backfills.values()) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # If login failed, setup_hook never ran load_config(): config.json hasn't been migrated
+        # yet, and writing our defaults over it would lose the subscriptions it still holds
+        if config_store.loaded:
+            await seen_store.save()
+        if review_stats is not None:
+            await review_stats.save()
+        await poller_lease.release()
+
+        poller_lease.close()
+        subscription_store.close()
+        if rmp_client is not None:
+            await rmp_client.close()
+        await log_store.close()
+        review_ledger.close()
+        seen_store.close()
+        if review_stats is not None:
+            review_stats.close()
+        review_archive.close()
+        if config_store.loaded:
+            await config_store.close()
+        await super().close()
+
+bot = RaalmBot(command_prefix="!", intents=intents, tree_cls=TimedCommandTree, **shard_options)
 
 # Global Config State
-rmp_config = {
-    "rmp_channel_ids": [],
-    "seen_reviews": []
-}
+config_store = ConfigStore(CONFIG_FILE, defaults={"draw_limits": DEFAULT_DRAW_LIMITS}, delay=CONFIG_SAVE_DELAY)
+rmp_config = config_store.data
 
-# --- Helper Functions ---
-
-def load_responses():
-    try:
-        with open('responses.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return ["错误：找不到 responses.json 文件！"]
+# Response pools are loaded once and hot-reloaded when the files change
+responses_pool = ResponsePool('responses.json', "错误：找不到 responses.json 文件！")
+fortunes_pool = ResponsePool('fortunes.json', "错误：找不到 fortunes.json 文件！")
+mark_startup("response_pools")
 
-def load_fortunes():
-    try:
-        with open('fortunes.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return ["错误：找不到 fortunes.json 文件！"]
+# --- Helper Functions ---
 
 def load_config():
-    global rmp_config
-    if os.path.exists(CONFIG_FILE):
+    global draw_limits
+    config_store.load()
+
+    # Rate limits and no-repeat window for /wsnd and /抽一签 (config.json "draw_limits")
+    draw_limits = DrawLimits.from_config(rmp_config.get("draw_limits", {}))
+
+    # Subscriptions and numRatings marks moved out of config.json into the shared store
+    legacy_state = rmp_config.pop("legacy_rmp_state", None)
+    if legacy_state:
+        subscription_store.import_legacy(
+            legacy_state.get("rmp_channel_ids", []),
+            legacy_state.get("rmp_subscriptions", {}),
+            legacy_state.get("rmp_num_ratings", {}),
+            default_professor=PROFESSOR_ID
+        )
+        config_store.save_now()
+
+    # seen_reviews moved out of config.json into the seen store.
+    # Review IDs are globally unique, so seeding every watched professor is safe.
+    legacy_seen = rmp_config.pop("legacy_seen_reviews", None)
+    if legacy_seen:
+        for professor_id in watched_professors():
+            seen_store.import_legacy(professor_id, legacy_seen)
+        config_store.save_now()
+
+def channel_professors(channel_id):
+    """Professors a channel is subscribed to; unsubscribed channels get the default professor."""
+    return subscription_store.professors(channel_id) or [PROFESSOR_ID]
+
+def watched_professors():
+    """Maps each watched professor to the channels subscribed to it."""
+    return subscription_store.watched()
+
+def resolve_channel(channel_id):
+    # With sharding the channel may belong to another process's guilds; a partial
+    # messageable can still send to it over HTTP
+    return bot.get_channel(channel_id) or bot.get_partial_messageable(channel_id)
+
+def channel_label(channel):
+    return getattr(channel, "name", None) or str(channel.id)
+
+def get_rmp_client():
+    """The shared RMP client (and watcher); rmp_helper and its HTTP stack are imported on first use."""
+    global rmp_client, rmp_watcher
+    if rmp_client is None:
+        from rmp_helper import RMPClient, RMPWatcher
+        rmp_client = RMPClient(timeout=RMP_TIMEOUT, max_concurrency=RMP_MAX_CONCURRENCY)
+        rmp_watcher = RMPWatcher(client=rmp_client, chunk_size=RMP_BATCH_SIZE)
+    return rmp_client
+
+def get_rmp_watcher():
+    get_rmp_client()
+    return rmp_watcher
+
+def get_helper(professor_id):
+    if professor_id not in rmp_helpers:
+        from rmp_helper import RMPHelper
+        rmp_helpers[professor_id] = RMPHelper(professor_id, client=get_rmp_client())
+    return rmp_helpers[professor_id]
+
+def get_review_stats():
+    """The stats store, or None if it can't be loaded. Stats are optional: callers skip them then."""
+    global review_stats, review_stats_unavailable
+    if review_stats is None and not review_stats_unavailable:
         try:
-            with open(CONFIG_FILE, 'r') as f:
-                data = json.load(f)
-
-                # Migration: Convert old single channel_id to list
-                if "rmp_channel_id" in data:
-                    cid = data.pop("rmp_channel_id")
-                    if cid:
-                        data.setdefault("rmp_channel_ids", [])
-                        if cid not in data["rmp_channel_ids"]:
-                            data["rmp_channel_ids"].append(cid)
-
-                rmp_config.update(data)
-
-                # Ensure rmp_channel_ids exists
-                if "rmp_channel_ids" not in rmp_config:
-                    rmp_config["rmp_channel_ids"] = []
-
+            from review_stats import ReviewStats
+            review_stats = ReviewStats(DB_FILE)
+        except ImportError as e:
+            review_stats_unavailable = True
+            logger.warning(f"Review stats disabled: {e}")
         except Exception as e:
-            logger.error(f"Failed to load config: {e}")
-
-def save_config():
+            # e.g. a locked database; tried again on next use
+            logger.error(f"Failed to open review stats: {e}")
+    return review_stats
+
+async def update_review_stats(professor_id, reviews):
+    """Adds `reviews` and persists them; any failure is logged and swallowed so it can never hold up delivery."""
+    stats = get_review_stats()
+    if stats is None:
+        return
     try:
-        # Trim seen_reviews to keep file size manageable
-        if len(rmp_config['seen_reviews']) > 50:
-            rmp_config['seen_reviews'] = rmp_config['seen_reviews'][-50:]
-
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(rmp_config, f, indent=2)
+        stats.add(professor_id, reviews)
+        await stats.save()
+    except Exception as e:
+        logger.error(f"Error updating review stats: {e}")
+
+async def schedule_history_backfills(details):
+    """
+    Starts a background backfill of the full review history for each probed professor
+    (`details`: {professor_id: details}) that stats or the archive doesn't have yet.
+    """
+    stats = get_review_stats()
+    try:
+        if stats is not None:
+            await stats.refresh()
     except Exception as e:
-        logger.error(f"Failed to save config: {e}")
+        logger.error(f"Error refreshing review stats: {e}")
+        stats = None
+    archived = await review_archive.complete()
+    for pid, d in details.items():
+        if pid in history_backfills:
+            continue
+        stats_needed = stats is not None and stats.needs_backfill(pid)
+        if stats_needed or pid not in archived:
+            history_backfills[pid] = asyncio.create_task(
+                backfill_history(pid, d.get('numRatings'), stats if stats_needed else None)
+            )
+
+def professor_name(details):
+    return f"{details['firstName']} {details['lastName']}" if details else "Unknown Professor"
 
 def log_message(content, channel_name, requester):
     """Logs a message sent by the bot."""
-    entry = {
+    log_store.log({
         "timestamp": datetime.now().isoformat(),
         "content": content[:200], # Store first 200 chars to avoid huge logs
         "channel": str(channel_name),
         "requester": str(requester)
-    }
+    })
 
-    try:
-        logs = []
-        if os.path.exists(LOG_FILE):
-            with open(LOG_FILE, 'r', encoding='utf-8') as f:
-                try:
-                    logs = json.load(f)
-                except json.JSONDecodeError:
-                    logs = []
-
-        logs.append(entry)
-
-        # Keep last 1000 logs locally
-        if len(logs) > 1000:
-            logs = logs[-1000:]
-
-        with open(LOG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(logs, f, indent=2, ensure_ascii=False)
-
-    except Exception as e:
-        logger.error(f"Failed to write log: {e}")
-
-# Load config on startup
-load_config()
+# Replaced with the configured limits when setup_hook loads config.json
+draw_limits = DrawLimits.from_config({})
 
 # --- RMP Logic ---
 
 async def post_review(channel, review, professor_name, requester="Auto"):
-    embed = discord.Embed(
-        title=f"New Review for {professor_name}",
-        description=review.get('comment', 'No comment provided.'),
-        color=discord.Color.red() if review.get('ratingTags') and "Tough grader" in review.get('ratingTags') else discord.Color.green()
-    )
-
-    # Fields
-    embed.add_field(name="Class", value=review.get('class', 'N/A'), inline=True)
-    embed.add_field(name="Date", value=review.get('date', 'N/A'), inline=True)
-    embed.add_field(name="Grade", value=review.get('grade', 'N/A'), inline=True)
-
-    # Ratings
-    difficulty = review.get('difficultyRating', 'N/A')
-    embed.add_field(name="Difficulty", value=f"{difficulty}/5", inline=True)
-
-    attendance = review.get('attendanceMandatory', 'N/A')
-    embed.add_field(name="Attendance", value=attendance, inline=True)
-
-    take_again = review.get('wouldTakeAgain', 'N/A')
-    embed.add_field(name="Take Again", value="Yes" if take_again else "No", inline=True)
+    """Sends one review embed. Send errors propagate so the delivery scheduler can retry them."""
+    # Rendered once per review and shared by every channel it goes to
+    embed = review_renderer.render(review, professor_name)
 
-    tags = review.get('ratingTags', '')
-    if tags:
-        embed.add_field(name="Tags", value=tags, inline=False)
-
-    embed.set_footer(text=f"Review ID: {review.get('id')}")
+    await channel.send(embed=embed)
 
+    # Bookkeeping failures must not look like send failures, or the review would be re-sent
     try:
-        await channel.send(embed=embed)
-        # Log the message
-        log_message(f"RMP Review ID: {review.get('id')}", channel.name, requester)
-    except discord.Forbidden:
-        logger.error(f"Failed to send message to channel {channel.id}: Forbidden")
+        await review_ledger.record(channel.id, review.id)
     except Exception as e:
-        logger.error(f"Failed to send message: {e}")
-
-@tasks.loop(minutes=10)
-async def check_rmp_updates():
-    channel_ids = rmp_config.get("rmp_channel_ids", [])
-    if not channel_ids:
-        return
+        logger.error(f"Failed to record review {review.id} for channel {channel.id}: {e}")
+    # Log the message
+    log_message(f"RMP Review ID: {review.id}", channel_label(channel), requester)
+
+def review_job(channel, review, professor_name, requester):
+    """A (label, send) pair for DeliveryScheduler.run."""
+    return f"review {review.id}", lambda: post_review(channel, review, professor_name, requester=requester)
+
+async def backfill_ledger(channel):
+    """Seeds the ledger once per channel from review embeds already in its history."""
+    sent_ids = set()
+    if LEDGER_BACKFILL_LIMIT:
+        # We look for the Review ID in the footer of embeds
+        async for msg in channel.history(limit=LEDGER_BACKFILL_LIMIT):
+            if msg.author == bot.user and msg.embeds:
+                for embed in msg.embeds:
+                    if embed.footer and embed.footer.text and "Review ID: " in embed.footer.text:
+                        sent_ids.add(embed.footer.text.replace("Review ID: ", ""))
+    await review_ledger.backfill(channel.id, sent_ids)
+    logger.info(f"Backfilled {len(sent_ids)} review IDs for channel {channel.id}")
 
+async def rmp_poll_loop():
+    """Polls each professor when the adaptive scheduler says it's due."""
     # Wait until bot is ready if this runs immediately on start
     await bot.wait_until_ready()
 
-    logger.info("Checking for RMP updates...")
-
-    # Fetch details for name
+    was_leader = False
+    while not bot.is_closed():
+        # Every process runs this loop, but only the lease holder polls
+        if not poller_lease.is_leader:
+            was_leader = False
+            await asyncio.sleep(POLLER_LEASE_RENEW)
+            continue
+        # An error here must not end the loop: the lease would keep being renewed by a
+        # process that no longer polls, and no other process could take over
+        try:
+            if not was_leader:
+                # Another process may have been polling since we loaded the seen store
+                await asyncio.to_thread(seen_store.reload)
+                was_leader = True
+                logger.info("This process is now the RMP poller.")
+                await catch_up_reviews()
+
+            if await poller_lease.consume_wakeup():
+                poll_scheduler.wake()
+            poll_scheduler.sync(watched_professors())
+            due = poll_scheduler.due()
+            if due:
+                await check_rmp_updates(due)
+            # Wake up at least once per renew interval to notice a lost lease or remote wakeups
+            await poll_scheduler.wait(max_wait=POLLER_LEASE_RENEW)
+        except Exception as e:
+            logger.error(f"Error in RMP poll loop: {e}")
+            await asyncio.sleep(POLLER_LEASE_RENEW)
+
+async def check_rmp_updates(professor_ids=None):
+    """Polls the given professors (default: all watched) and reschedules each by its outcome."""
+    if professor_ids is None:
+        professor_ids = list(watched_professors())
+    with POLL_SECONDS.time():
+        outcomes = await poll_rmp(professor_ids)
+    for professor_id in professor_ids:
+        poll_scheduler.record(professor_id, outcomes.get(professor_id, "error"))
+    return outcomes
+
+async def poll_rmp(professor_ids):
+    """Returns {professor_id: "new" | "unchanged" | "error"} for the professors polled."""
+    watchers = watched_professors()
+    professor_ids = [pid for pid in professor_ids if pid in watchers]
+    if not professor_ids:
+        return {}
+
+    logger.info(f"Checking for RMP updates ({len(professor_ids)} professors)...")
+
+    # Anything that doesn't get a result below failed and will back off
+    outcomes = {pid: "error" for pid in professor_ids}
     try:
-        details = rmp_helper.get_professor_details()
-        prof_name = f"{details['firstName']} {details['lastName']}" if details else "Unknown Professor"
+        # Cheap probe first: only professors whose numRatings moved need their ratings fetched
+        details = await get_rmp_watcher().probe(professor_ids)
+        changed = []
+        for pid, d in details.items():
+            if d.get('numRatings') != subscription_store.high_water(pid):
+                changed.append(pid)
+            else:
+                outcomes[pid] = "unchanged"
+
+        await schedule_history_backfills(details)
+
+        if not changed:
+            return outcomes
+
+        # Page through the newest reviews only until we hit one we've already seen
+        known = {pid: seen_store.view(pid) for pid in changed}
+        results = await get_rmp_watcher().fetch_new_reviews(
+            changed, known, page_size=RMP_PAGE_SIZE, max_pages=RMP_MAX_PAGES
+        )
+
+        deliveries = {}
+        high_water = {}
+        new_reviews = {}
+        for professor_id, reviews in results.items():
+            await review_archive.add(professor_id, reviews)
+            if len(reviews) >= RMP_PAGE_SIZE * RMP_MAX_PAGES:
+                # Paging stopped before reaching a known review, so older ones may be missing
+                await review_archive.set_complete(professor_id, False)
+            high_water[professor_id] = details[professor_id].get('numRatings')
+            new = new_reviews[professor_id] = queue_new_reviews(
+                deliveries, professor_id, reviews, professor_name(details[professor_id]), watchers
+            )
+            outcomes[professor_id] = "new" if new else "unchanged"
+
+        # Channels are sent to in parallel; each channel still gets its reviews in order
+        if deliveries:
+            await delivery.run(deliveries)
+
+        # Persist even without new reviews: the numRatings high-water marks moved
+        if results:
+            await subscription_store.set_high_water(high_water)
+            await seen_store.save()
+            for professor_id, new in new_reviews.items():
+                await update_review_stats(professor_id, new)
 
-        # Fetch all reviews (fetching a larger number to ensure we get new ones)
-        reviews = rmp_helper.get_reviews(count=20)
+    except Exception as e:
+        logger.error(f"Error in check_rmp_updates: {e}")
 
-        if not reviews:
-            return
+    return outcomes
+
+def queue_new_reviews(deliveries, professor_id, reviews, prof_name, watchers):
+    """
+    Marks the unseen ones among a professor's newest-first `reviews` as seen and queues them,
+    oldest first, for every subscribed channel in `deliveries`. Returns the new reviews.
+    """
+    reviews_to_post = []
+    for review in reversed(reviews):
+        if not seen_store.is_seen(professor_id, review.id):
+            reviews_to_post.append(review)
+            seen_store.add(professor_id, review.id)
+
+    for channel_id in watchers.get(professor_id, ()):
+        channel = resolve_channel(channel_id)
+        jobs = deliveries.setdefault(channel, [])
+        jobs.extend(review_job(channel, review, prof_name, "Auto") for review in reviews_to_post)
+    return reviews_to_post
+
+async def catch_up_reviews():
+    """
+    Run when this process becomes the poller. A regular poll only looks RMP_MAX_PAGES pages
+    back, so after a long outage each watched professor is paged back to the newest review
+    already archived or seen, and everything missed is archived and delivered. Professors
+    with no history yet are left to the first poll, which seeds them.
+    """
+    watchers = watched_professors()
+
+    async def fetch(professor_id):
+        known = await review_archive.review_ids(professor_id)
+        known.update(seen_store.view(professor_id))
+        if not known:
+            return []
+        reached = []
+
+        def stop(review):
+            if review.id in known:
+                reached.append(review.id)
+                return True
+            return False
+
+        reviews = await get_helper(professor_id).get_reviews_until(
+            stop, page_size=CATCHUP_PAGE_SIZE, max_pages=CATCHUP_MAX_PAGES, cached=False
+        )
+        await review_archive.add(professor_id, reviews)
+        if not reached:
+            # Ran out of pages (or hit an error) first: the archive has a gap until the next backfill
+            await review_archive.set_complete(professor_id, False)
+        return reviews
 
-        # Process reviews from oldest to newest
-        reviews.reverse()
-
-        new_reviews_found = False
-
-        # Identify which reviews are new globally
-        reviews_to_post = []
-        for review in reviews:
-            rid = review.get('id')
-            if rid not in rmp_config['seen_reviews']:
-                reviews_to_post.append(review)
-                rmp_config['seen_reviews'].append(rid)
-                new_reviews_found = True
-
-        # Post new reviews to ALL subscribed channels
-        if reviews_to_post:
-            for channel_id in channel_ids:
-                channel = bot.get_channel(channel_id)
-                if channel:
-                    for review in reviews_to_post:
-                        logger.info(f"Posting review {review.get('id')} to channel {channel.name}")
-                        await post_review(channel, review, prof_name, requester="Auto")
-                        await asyncio.sleep(1) # Delay between messages
-                else:
-                    logger.warning(f"Channel ID {channel_id} not found/accessible.")
-
-        if new_reviews_found:
-            save_config()
+    try:
+        professor_ids = list(watchers)
+        fetched = await asyncio.gather(*(fetch(pid) for pid in professor_ids))
+        deliveries = {}
+        missed = {}
+        for professor_id, reviews in zip(professor_ids, fetched):
+            if not any(not seen_store.is_seen(professor_id, review.id) for review in reviews):
+                continue
+            prof_name = professor_name(await get_helper(professor_id).get_professor_details())
+            missed[professor_id] = queue_new_reviews(deliveries, professor_id, reviews, prof_name, watchers)
+        if deliveries:
+            await delivery.run(deliveries)
+        if missed:
+            await seen_store.save()
+            for professor_id, new in missed.items():
+                await update_review_stats(professor_id, new)
+            logger.info(f"Caught up on {sum(map(len, missed.values()))} reviews missed while no process was polling")
+    except Exception as e:
+        logger.error(f"Error catching up on RMP reviews: {e}")
+
+async def backfill_history(professor_id, num_ratings, stats=None):
+    """
+    Pages a professor's full review history into the archive, and into `stats` when given,
+    once; retried on a later poll if it fails.
+    """
+    count = 0
+    try:
+        helper = get_helper(professor_id)
+        cursor = None
+        for _ in range(HISTORY_MAX_PAGES):
+            page, next_cursor = await helper.get_reviews_page(count=HISTORY_PAGE_SIZE, cursor=cursor, cached=False)
+            # get_reviews_page returns an empty last page on errors; a page we expected to exist didn't arrive
+            if not page and (cursor or num_ratings):
+                raise RuntimeError("review page missing")
+            if stats is not None:
+                stats.add(professor_id, page)
+            await review_archive.add(professor_id, page)
+            count += len(page)
+            cursor = next_cursor
+            if not cursor:
+                break
+        if stats is not None:
+            await stats.save()
+            await stats.mark_backfilled(professor_id)
+        # Histories longer than HISTORY_MAX_PAGES pages are never complete; /mynewsanrr asks RMP for them
+        if not cursor:
+            await review_archive.set_complete(professor_id)
+        logger.info(f"Backfilled {count} reviews for professor {professor_id}")
+    except Exception as e:
+        if stats is not None:
+            await stats.save()
+        logger.error(f"Failed to backfill review history for professor {professor_id}: {e}")
+    finally:
+        history_backfills.pop(professor_id, None)
 
+@bot.event
+async def on_app_command_completion(interaction, command):
+    if "started" in interaction.extras:
+        COMMAND_SECONDS.observe(time.perf_counter() - interaction.extras["started"], command=command.name)
+
+@tasks.loop(seconds=30)
+async def reload_pools():
+    for pool in (responses_pool, fortunes_pool):
+        if await pool.reload_if_changed():
+            logger.info(f"Reloaded {pool.path} ({len(pool.items)} entries)")
+
+def command_tree_hash():
+    """Digest of the slash command definitions, to tell whether Discord needs a re-sync."""
+    payload = [command.to_dict(bot.tree) for command in bot.tree.get_commands()]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+async def sync_commands_if_changed():
+    """Pushes the command tree to Discord only if it changed since the last sync (hash kept in config.json)."""
+    started = time.perf_counter()
+    try:
+        digest = command_tree_hash()
+        if rmp_config.get("command_tree_hash") == digest:
+            logger.info("Slash commands unchanged since the last sync; skipping it.")
+            return
+        synced = await bot.tree.sync()
+        rmp_config["command_tree_hash"] = digest
+        config_store.save()
+        logger.info(f"Synced {len(synced)} slash commands.")
     except Exception as e:
-        logger.error(f"Error in check_rmp_updates: {e}")
+        logger.error(f"Failed to sync slash commands: {e}")
+    finally:
+        startup_phases["command_sync"] = time.perf_counter() - started
+        STARTUP_SECONDS.set(startup_phases["command_sync"], phase="command_sync")
+
+def report_startup():
+    for phase, seconds in startup_phases.items():
+        STARTUP_SECONDS.set(seconds, phase=phase)
+    phases = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in startup_phases.items())
+    logger.info(f"Ready {time.perf_counter() - STARTUP_STARTED:.2f}s after start ({phases})")
 
 @bot.event
 async def on_ready():
     logger.info(f'RaalmBot 已上线: {bot.user} (ID: {bot.user.id})')
+    # on_ready fires again after reconnects; only the first one ends startup
+    if "gateway" not in startup_phases:
+        mark_startup("gateway")
+        report_startup()
 
     # Start the loop if not already running
-    if not check_rmp_updates.is_running():
-        check_rmp_updates.start()
+    global rmp_poll_task
+    if rmp_poll_task is None or rmp_poll_task.done():
+        rmp_poll_task = asyncio.create_task(rmp_poll_loop())
+    if not reload_pools.is_running():
+        reload_pools.start()
 
 @bot.event
 async def on_message(message):
@@ -242,29 +653,52 @@ async def on_message(message):
 
     await bot.process_commands(message)
 
+async def serve_draw(interaction, pool, name):
+    """Shared body of the random-draw commands: rate limit, draw (avoiding the channel's recent picks), send."""
+    wait = draw_limits.acquire(interaction.user.id, interaction.guild_id)
+    if wait:
+        # Throttled calls are neither logged nor counted against the pool, only in the metric
+        DRAW_COMMANDS.inc(command=name, outcome="throttled")
+        await interaction.response.send_message(f"抽得太快了，请 {math.ceil(wait)} 秒后再试。", ephemeral=True)
+        return
+
+    selected = pool.choice(draw_limits.recent(name, interaction.channel_id))
+    await interaction.response.send_message(selected)
+    DRAW_COMMANDS.inc(command=name, outcome="served")
+    log_message(selected, interaction.channel.name if interaction.channel else "DM", interaction.user.name)
+
 @bot.tree.command(name="wsnd", description="随机抽取一条回复")
 @app_commands.allowed_installs(guilds=True, users=True)
 @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
 async def wsnd(interaction: discord.Interaction):
-    options = load_responses()
-    selected = random.choice(options)
-    await interaction.response.send_message(selected)
-    log_message(selected, interaction.channel.name if interaction.channel else "DM", interaction.user.name)
+    await serve_draw(interaction, responses_pool, "wsnd")
 
 @bot.tree.command(name="抽一签", description="想你了m萨")
 @app_commands.allowed_installs(guilds=True, users=True)
 @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
 async def draw_lot(interaction: discord.Interaction):
-    fortunes = load_fortunes()
-    selected = random.choice(fortunes)
-    await interaction.response.send_message(selected)
-    log_message(selected, interaction.channel.name if interaction.channel else "DM", interaction.user.name)
+    await serve_draw(interaction, fortunes_pool, "抽一签")
+
+@bot.tree.command(name="reloadpools", description="重新加载回复和签文文件")
+@app_commands.default_permissions(administrator=True)
+async def reload_pools_command(interaction: discord.Interaction):
+    for pool in (responses_pool, fortunes_pool):
+        await pool.reload()
+    msg = f"已重新加载: {len(responses_pool.items)} 条回复, {len(fortunes_pool.items)} 条签文。"
+    await interaction.response.send_message(msg, ephemeral=True)
+    log_message(msg, interaction.channel.name if interaction.channel else "DM", interaction.user.name)
 
 # --- RMP Commands ---
 
+def format_professor_schedule(professor_id):
+    next_poll = poll_scheduler.next_poll_in(professor_id)
+    if next_poll is None:
+        return str(professor_id)
+    return f"{professor_id} (下次检查 {int(next_poll // 60)} 分钟后)"
+
 @bot.tree.command(name="rmpstatus", description="查看当前自动获取 sanrr 评价的频道")
 async def rmp_status(interaction: discord.Interaction):
-    ids = rmp_config.get("rmp_channel_ids", [])
+    ids = subscription_store.channel_ids()
     if not ids:
         await interaction.response.send_message("目前没有在任何频道自动获取 sanrr 评价。")
         return
@@ -272,42 +706,60 @@ async def rmp_status(interaction: discord.Interaction):
     channels_list = []
     for cid in ids:
         ch = bot.get_channel(cid)
+        professors = ", ".join(format_professor_schedule(pid) for pid in channel_professors(cid))
         if ch:
-            channels_list.append(f"{ch.name} (ID: {cid})")
+            channels_list.append(f"{ch.name} (ID: {cid}) - 教授: {professors}")
         else:
-            channels_list.append(f"Unknown Channel (ID: {cid})")
+            channels_list.append(f"Unknown Channel (ID: {cid}) - 教授: {professors}")
 
+    client = get_rmp_client()
+    cache = client.cache.stats()
     msg = "正在以下频道自动获取 sanrr 评价:\n" + "\n".join(channels_list)
+    msg += f"\nRMP 缓存: 命中 {cache['hits']} / 过期命中 {cache['stale_hits']} / 未命中 {cache['misses']} / 合并 {cache['coalesced']}"
+    msg += f"\nRMP 熔断器: {client.breaker.state}"
     await interaction.response.send_message(msg)
     log_message(msg, interaction.channel.name, interaction.user.name)
 
 
 @bot.tree.command(name="rmsanrr", description="添加当前频道到 RateMyProfessor 监控列表")
 @app_commands.default_permissions(administrator=True)
-async def start_rmp(interaction: discord.Interaction):
+@app_commands.describe(professor_id="RateMyProfessor 教授 ID（留空则使用默认教授）")
+async def start_rmp(interaction: discord.Interaction, professor_id: int = None):
     channel_id = interaction.channel_id
-    if channel_id not in rmp_config['rmp_channel_ids']:
-        rmp_config['rmp_channel_ids'].append(channel_id)
-        save_config()
+    subscribed = subscription_store.professors(channel_id)
+    if not subscribed:
+        await subscription_store.add(channel_id, PROFESSOR_ID if professor_id is None else professor_id)
         msg = f"已将当前频道 (<#{channel_id}>) 添加到 RateMyProfessor 监控列表。"
         await interaction.response.send_message(msg)
         log_message(msg, interaction.channel.name, interaction.user.name)
+    elif professor_id is not None and professor_id not in subscribed:
+        await subscription_store.add(channel_id, professor_id)
+        msg = f"当前频道已开始监控教授 {professor_id}。"
+        await interaction.response.send_message(msg)
+        log_message(msg, interaction.channel.name, interaction.user.name)
     else:
         msg = "当前频道已在监控列表中。"
         await interaction.response.send_message(msg, ephemeral=True)
         log_message(msg, interaction.channel.name, interaction.user.name)
 
-    # Trigger update immediately
-    if not check_rmp_updates.is_running():
-        check_rmp_updates.start()
+    # Trigger update immediately (newly watched professors are due right away)
+    poll_scheduler.nudge()
 
 @bot.tree.command(name="byebyesanrr", description="从 RateMyProfessor 监控列表中移除当前频道")
 @app_commands.default_permissions(administrator=True)
-async def stop_rmp(interaction: discord.Interaction):
+@app_commands.describe(professor_id="只停止监控该教授（留空则移除整个频道）")
+async def stop_rmp(interaction: discord.Interaction, professor_id: int = None):
     channel_id = interaction.channel_id
-    if channel_id in rmp_config['rmp_channel_ids']:
-        rmp_config['rmp_channel_ids'].remove(channel_id)
-        save_config()
+    subscribed = subscription_store.professors(channel_id)
+    if professor_id is not None and subscribed and professor_id not in subscribed:
+        await interaction.response.send_message(f"当前频道没有监控教授 {professor_id}。", ephemeral=True)
+    elif professor_id is not None and len(subscribed) > 1:
+        await subscription_store.remove(channel_id, professor_id)
+        msg = f"当前频道已停止监控教授 {professor_id}。"
+        await interaction.response.send_message(msg)
+        log_message(msg, interaction.channel.name, interaction.user.name)
+    elif subscribed:
+        await subscription_store.remove(channel_id)
         msg = "已停止当前频道的 RateMyProfessor 监控。"
         await interaction.response.send_message(msg)
         log_message(msg, interaction.channel.name, interaction.user.name)
@@ -319,10 +771,30 @@ async def stop_rmp(interaction: discord.Interaction):
 async def force_rmp(interaction: discord.Interaction):
     await interaction.response.send_message("正在强制检查更新...", ephemeral=True)
     log_message("Force RMP Check triggered", interaction.channel.name, interaction.user.name)
-    check_rmp_updates.restart()
+    # Runs right after any in-progress poll instead of cancelling it
+    if poller_lease.is_leader:
+        poll_scheduler.wake()
+    else:
+        await poller_lease.request_wakeup()
+
+async def recent_reviews(professor_id, since):
+    """
+    Newest-first reviews posted at or after `since`. Watched professors whose full history is
+    archived are kept current by the poller, so they're read locally; anyone else is fetched
+    and archived.
+    """
+    if professor_id in watched_professors() and professor_id in await review_archive.complete():
+        return await review_archive.recent(professor_id, since)
+    # Reviews come newest first, so an undated one is still inside the window
+    reviews = await get_helper(professor_id).get_reviews_until(
+        lambda review: review.posted_at is not None and review.posted_at < since
+    )
+    await review_archive.add(professor_id, reviews)
+    return reviews
 
-@bot.tree.command(name="mynewsanrr", description="检查最近5天的评价并补发")
-async def my_new_sanrr(interaction: discord.Interaction):
+@bot.tree.command(name="mynewsanrr", description="检查最近几天的评价并补发")
+@app_commands.describe(days="检查最近多少天 (默认5天)")
+async def my_new_sanrr(interaction: discord.Interaction, days: app_commands.Range[int, 1, 365] = 5):
     await interaction.response.defer() # Long running task
 
     channel = interaction.channel
@@ -331,57 +803,39 @@ async def my_new_sanrr(interaction: discord.Interaction):
         return
 
     try:
-        # 1. Fetch RMP reviews (last 50 to be safe)
-        reviews = rmp_helper.get_reviews(count=50)
-
-        # 2. Filter for last 5 days
-        recent_reviews = []
-        now = datetime.now(timezone.utc)
-
-        for r in reviews:
-            # Parse date: "2025-12-25 23:17:27 +0000 UTC"
-            # We need to handle the format carefully.
-            try:
-                # Remove " UTC" at the end and parse
-                date_str = r['date'].replace(" UTC", "")
-                r_date = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S %z")
-
-                # Check if within 5 days
-                if (now - r_date).days <= 5:
-                    recent_reviews.append(r)
-            except ValueError:
-                # Fallback if format changes, maybe just skip date check or log error
-                logger.warning(f"Failed to parse date: {r['date']}")
-                continue
-
-        if not recent_reviews:
-            await interaction.followup.send("最近5天没有新的评价。")
+        # 1. Reviews from the last `days` days for every professor this channel follows,
+        # newest first, from the local archive where it's kept current
+        since = int(time.time()) - days * DAY
+        professor_ids = channel_professors(channel.id)
+        fetched = await asyncio.gather(*(recent_reviews(pid, since) for pid in professor_ids))
+        recent = [(pid, r) for pid, batch in zip(professor_ids, fetched) for r in batch]
+
+        if not recent:
+            await interaction.followup.send(f"最近{days}天没有新的评价。")
             log_message("No recent reviews found (mynewsanrr)", channel.name, interaction.user.name)
             return
 
-        # 3. Check channel history for these reviews
-        # We look for the Review ID in the footer of embeds
-        sent_ids = set()
-        async for msg in channel.history(limit=200): # Check last 200 messages
-            if msg.author == bot.user and msg.embeds:
-                for embed in msg.embeds:
-                    if embed.footer and embed.footer.text and "Review ID: " in embed.footer.text:
-                        rid = embed.footer.text.replace("Review ID: ", "")
-                        sent_ids.add(rid)
+        # 2. Look up which of these reviews the channel already has in the local ledger
+        if await review_ledger.needs_backfill(channel.id):
+            await backfill_ledger(channel)
+        sent_ids = await review_ledger.sent_ids(channel.id)
 
-        # 4. Post missing reviews
+        # 3. Post missing reviews
         posted_count = 0
-        details = rmp_helper.get_professor_details()
-        prof_name = f"{details['firstName']} {details['lastName']}" if details else "Unknown Professor"
+        prof_names = {}
+        for pid in dict.fromkeys(pid for pid, _ in recent):
+            prof_names[pid] = professor_name(await get_helper(pid).get_professor_details())
 
         # Reverse to post oldest first
-        recent_reviews.reverse()
+        recent.reverse()
 
-        for r in recent_reviews:
-            if r['id'] not in sent_ids:
-                await post_review(channel, r, prof_name, requester=interaction.user.name)
-                posted_count += 1
-                await asyncio.sleep(1)
+        jobs = [
+            review_job(channel, r, prof_names[pid], interaction.user.name)
+            for pid, r in recent if r.id not in sent_ids
+        ]
+        if jobs:
+            results = await delivery.run({channel: jobs})
+            posted_count = sum(1 for result in results if result["ok"])
 
         result_msg = f"检查完成。补发了 {posted_count} 条评价。"
         await interaction.followup.send(result_msg)
@@ -392,45 +846,206 @@ async def my_new_sanrr(interaction: discord.Interaction):
         await interaction.followup.send(err_msg)
         logger.error(err_msg)
 
-@bot.tree.command(name="botlog", description="查看 Bot 最近发送的消息记录")
-async def bot_log(interaction: discord.Interaction):
-    if not os.path.exists(LOG_FILE):
-        await interaction.response.send_message("暂无日志记录。")
+def format_rating(value):
+    return "—" if value is None else f"{value:.2f}"
+
+@bot.tree.command(name="sanrrstats", description="查看教授评价的统计数据（均分走势、标签、成绩分布）")
+@app_commands.describe(professor_id="RateMyProfessor 教授 ID（留空则使用当前频道监控的教授）")
+async def sanrr_stats(interaction: discord.Interaction, professor_id: int = None):
+    if professor_id is None:
+        professor_id = channel_professors(interaction.channel_id)[0]
+    # Served entirely from precomputed aggregates; the name comes from the RMP cache if it's there
+    stats = get_review_stats()
+    if stats is None:
+        await interaction.response.send_message("统计功能未启用（需要安装 NumPy）。", ephemeral=True)
+        return
+    await stats.refresh()
+    summary = stats.summary(professor_id)
+    if summary is None:
+        msg = f"还没有教授 {professor_id} 的评价数据（只统计正在监控的教授，首次加载可能需要几分钟）。"
+        await interaction.response.send_message(msg, ephemeral=True)
         return
 
-    try:
-        with open(LOG_FILE, 'r', encoding='utf-8') as f:
-            logs = json.load(f)
+    details = rmp_client.cache.get(("details", str(professor_id))) if rmp_client else None
+    embed = discord.Embed(
+        title=f"{professor_name(details) if details else professor_id} 的评价统计",
+        color=discord.Color.blue()
+    )
+    wta = summary["would_take_again"]
+    embed.add_field(name="评价数", value=str(summary["count"]), inline=True)
+    embed.add_field(name="Quality", value=format_rating(summary["quality"]), inline=True)
+    embed.add_field(name="Difficulty", value=format_rating(summary["difficulty"]), inline=True)
+    embed.add_field(name="Would Take Again", value="—" if wta is None else f"{wta:.0f}%", inline=True)
+
+    rolling = "\n".join(
+        f"{label} ({n} 条): Q {format_rating(quality)} / D {format_rating(difficulty)}"
+        for label, n, quality, difficulty in summary["recent"]
+    )
+    embed.add_field(name="近期均分", value=field_value(rolling), inline=False)
+    trend = "\n".join(f"{year}: Q {format_rating(quality)} ({n} 条)" for year, n, quality in summary["trend"])
+    embed.add_field(name="年度走势", value=field_value(trend), inline=False)
+    embed.add_field(
+        name="Difficulty 分布",
+        value=field_value(" ".join(f"{level}★ {count}" for level, count in enumerate(summary["difficulty_histogram"], 1))),
+        inline=False
+    )
+    embed.add_field(name="常见标签", value=field_value(", ".join(f"{tag} ×{count}" for tag, count in summary["tags"])), inline=False)
+    embed.add_field(name="成绩分布", value=field_value(", ".join(f"{grade}: {count}" for grade, count in summary["grades"])), inline=False)
+
+    await interaction.response.send_message(embed=embed)
+    log_message(f"Review stats for professor {professor_id}", interaction.channel.name, interaction.user.name)
+
+def parse_log_time(value):
+    """Parses a /botlog time bound ("2024-05-01" or "2024-05-01 13:30") into the stored ISO form."""
+    return datetime.fromisoformat(value.strip()).isoformat() if value else None
+
+LOG_PAGE_CHARS = 1900 # Discord's message limit, with room to spare
+
+def log_page_header(filters):
+    title = "最近的消息记录" if not any(filters.values()) else "筛选后的消息记录"
+    return f"### {title}:\n"
+
+def log_line(entry):
+    return f"`#{entry['id']}` [{entry['timestamp']}] **{entry['requester']}** @ {entry['channel']}: {entry['content'][:50]}...\n"
+
+def fit_log_page(entries, filters, keep_newest=True):
+    """
+    The part of a newest-first page that fits in one message, kept from the end next to the
+    cursor (the newest rows when paging back, the oldest when paging forward), so the rows
+    left out are the first ones read by the next page in that direction.
+    """
+    budget = LOG_PAGE_CHARS - len(log_page_header(filters))
+    ordered = entries if keep_newest else list(reversed(entries))
+    shown = []
+    for entry in ordered:
+        budget -= len(log_line(entry))
+        if budget < 0:
+            break
+        shown.append(entry)
+    return shown if keep_newest else list(reversed(shown))
+
+def format_log_page(entries, filters):
+    # Pages are read newest first; show them oldest first like the original log
+    return log_page_header(filters) + "".join(log_line(entry) for entry in reversed(entries))
+
+class LogPageView(discord.ui.View):
+    """Older/newer buttons for /botlog; each press reads one page past the shown id range."""
+
+    def __init__(self, owner_id, filters, entries, has_older, has_newer=False):
+        super().__init__(timeout=600)
+        self.owner_id = owner_id
+        self.filters = filters
+        self.show(entries, has_older, has_newer)
+
+    def show(self, entries, has_older, has_newer):
+        self.entries = entries
+        self.newer_page.disabled = not has_newer
+        self.older_page.disabled = not has_older
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        return interaction.user.id == self.owner_id
+
+    async def turn(self, interaction, **cursor):
+        entries, has_more = await log_store.page(limit=LOG_PAGE_SIZE, **self.filters, **cursor)
+        if not entries:
+            await interaction.response.defer()
+            return
+        shown = fit_log_page(entries, self.filters, keep_newest="before_id" in cursor)
+        has_more = has_more or len(shown) < len(entries)
+        entries = shown
+        if "before_id" in cursor:
+            self.show(entries, has_older=has_more, has_newer=True)
+        else:
+            self.show(entries, has_older=True, has_newer=has_more)
+        await interaction.response.edit_message(content=format_log_page(entries, self.filters), view=self)
 
-        if not logs:
-            await interaction.response.send_message("暂无日志记录。")
+    @discord.ui.button(label="◀ 更新", style=discord.ButtonStyle.secondary)
+    async def newer_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.turn(interaction, after_id=self.entries[0]["id"])
+
+    @discord.ui.button(label="更早 ▶", style=discord.ButtonStyle.secondary)
+    async def older_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.turn(interaction, before_id=self.entries[-1]["id"])
+
+@bot.tree.command(name="botlog", description="查看 Bot 最近发送的消息记录")
+@app_commands.describe(
+    requester="只看该用户触发的消息",
+    channel="只看该频道（频道名或 DM）",
+    since="起始时间，例如 2024-05-01 或 2024-05-01 13:30",
+    until="结束时间（不含），格式同上",
+)
+async def bot_log(interaction: discord.Interaction, requester: str = None, channel: str = None,
+                  since: str = None, until: str = None):
+    try:
+        try:
+            filters = {"requester": requester, "channel": channel,
+                       "since": parse_log_time(since), "until": parse_log_time(until)}
+        except ValueError:
+            await interaction.response.send_message("时间格式应为 YYYY-MM-DD 或 YYYY-MM-DD HH:MM。", ephemeral=True)
             return
 
-        # Get last 100
-        recent_logs = logs[-100:]
+        # Make sure entries queued by this process are visible, then read only the first page
+        await log_store.flush()
+        entries, has_older = await log_store.page(limit=LOG_PAGE_SIZE, **filters)
 
-        # Format output
-        output = "### 最近 100 条消息记录:\n"
-        for entry in recent_logs:
-            line = f"[{entry['timestamp']}] **{entry['requester']}** @ {entry['channel']}: {entry['content'][:50]}...\n"
-            if len(output) + len(line) > 1900: # Discord limit
-                break
-            output += line
+        if not entries:
+            await interaction.response.send_message("暂无日志记录。")
+            return
 
-        await interaction.response.send_message(output)
+        shown = fit_log_page(entries, filters)
+        has_older = has_older or len(shown) < len(entries)
+        entries = shown
+        view = LogPageView(interaction.user.id, filters, entries, has_older)
+        await interaction.response.send_message(format_log_page(entries, filters), view=view)
 
     except Exception as e:
         await interaction.response.send_message(f"读取日志出错: {str(e)}")
 
 
+def format_timing(summary):
+    return f"{summary['count']} 次 / 平均 {summary['mean']:.3f}s / p95 ≤ {summary['p95']}s"
+
+@bot.tree.command(name="botstats", description="查看 Bot 性能统计")
+async def bot_stats(interaction: discord.Interaction):
+    lines = ["### Bot 性能统计", "**命令延迟:**"]
+    for name in COMMAND_SECONDS.label_values("command"):
+        errors = COMMAND_ERRORS.value(command=name)
+        lines.append(f"- /{name}: {format_timing(COMMAND_SECONDS.summary(command=name))}, 出错 {errors} 次")
+
+    from rmp_helper import REQUEST_SECONDS as RMP_REQUEST_SECONDS, REQUEST_ERRORS as RMP_REQUEST_ERRORS
+    rmp_requests = RMP_REQUEST_SECONDS.summary()
+    rmp_errors = RMP_REQUEST_ERRORS.total()
+    error_rate = rmp_errors / rmp_requests["count"] * 100 if rmp_requests["count"] else 0
+    lines.append(f"**RMP 请求:** {format_timing(rmp_requests)}, 错误率 {error_rate:.1f}%")
+    lines.append(f"**RMP 轮询:** {format_timing(POLL_SECONDS.summary())}")
+    lines.append(f"**评价投递:** {format_timing(DELIVERY_SECONDS.summary())}")
+    lines.append(f"**日志写入:** {format_timing(LOG_WRITE_SECONDS.summary())}")
+    for name in DRAW_COMMANDS.label_values("command"):
+        served = DRAW_COMMANDS.value(command=name, outcome="served")
+        throttled = DRAW_COMMANDS.value(command=name, outcome="throttled")
+        lines.append(f"**/{name}:** 已抽 {served} 次, 限流 {throttled} 次")
+    lines.append(
+        f"**事件循环延迟:** 当前 {metrics.LOOP_LAG.value():.3f}s, "
+        f"p95 ≤ {metrics.LOOP_LAG_HISTOGRAM.summary()['p95']}s"
+    )
+    lines.append("**启动耗时:** " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in startup_phases.items()))
+
+    msg = "\n".join(lines)[:1900] # Discord limit
+    await interaction.response.send_message(msg)
+    log_message(msg, interaction.channel.name if interaction.channel else "DM", interaction.user.name)
+
 # --- 4. 同步指令 (管理员专用) ---
 @bot.command()
 async def sync(ctx):
     print("正在同步指令...")
     fmt = await ctx.bot.tree.sync()
+    rmp_config["command_tree_hash"] = command_tree_hash()
+    config_store.save()
     await ctx.send(f"同步完成！共同步了 {len(fmt)} 个指令。")
     log_message(f"Synced {len(fmt)} commands", ctx.channel.name, ctx.author.name)
 
+mark_startup("commands")
+
 if __name__ == "__main__":
     if TOKEN:
         bot.run(TOKEN)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+import asyncio
+import copy
+import json
+import logging
+import os
+from draw_limits import DEFAULT_DRAW_LIMITS
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of config.json changes, and add a step to MIGRATIONS
+CONFIG_VERSION = 5
+
+def _migrate_v1(data):
+    # v1 -> v2: single rmp_channel_id became the rmp_channel_ids list
+    cid = data.pop("rmp_channel_id", None)
+    data.setdefault("rmp_channel_ids", [])
+    if cid and cid not in data["rmp_channel_ids"]:
+        data["rmp_channel_ids"].append(cid)
+
+def _migrate_v2(data):
+    # v2 -> v3: per-channel professor subscriptions and numRatings high-water marks.
+    # seen_reviews moved to the seen store; it is parked under legacy_seen_reviews
+    # until the bot has imported it.
+    data.setdefault("rmp_subscriptions", {})
+    data.setdefault("rmp_num_ratings", {})
+    seen = data.pop("seen_reviews", None)
+    if seen:
+        data["legacy_seen_reviews"] = seen
+
+def _migrate_v3(data):
+    # v3 -> v4: subscriptions and numRatings marks moved to the shared SQLite store so
+    # several bot processes can use them; parked under legacy_rmp_state until imported.
+    keys = ("rmp_channel_ids", "rmp_subscriptions", "rmp_num_ratings")
+    legacy = {key: data.pop(key) for key in keys if key in data}
+    if legacy:
+        data["legacy_rmp_state"] = legacy
+
+def _migrate_v4(data):
+    # v4 -> v5: rate limits and no-repeat window for /wsnd and /抽一签
+    data.setdefault("draw_limits", copy.deepcopy(DEFAULT_DRAW_LIMITS))
+
+MIGRATIONS = {1: _migrate_v1, 2: _migrate_v2, 3: _migrate_v3, 4: _migrate_v4}
+
+class ConfigStore:
+    """
+    config.json with a versioned schema. save() only schedules a write: changes made within
+    `delay` seconds of each other share one flush, which runs off the event loop and
+    replaces the file atomically (write to a temp file, then rename). A file that failed
+    to load is never written over; it's left for the operator to fix.
+    """
+
+    def __init__(self, path, defaults, delay=1.0):
+        self.path = path
+        self.delay = delay
+        self.data = copy.deepcopy(defaults)
+        self._flush_task = None
+        self._dirty = False # Changed since the last snapshot was taken
+        self._load_failed = False
+        self.loaded = False
+        self._lock = asyncio.Lock()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            self.loaded = True
+            return self.data
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            self._load_failed = True
+            logger.error(f"Failed to load config: {e}; changes won't be saved until {self.path} is fixed")
+            return self.data
+
+        version = data.pop("version", 1)
+        migrated = version < CONFIG_VERSION
+        while version < CONFIG_VERSION:
+            MIGRATIONS[version](data)
+            version += 1
+            logger.info(f"Migrated {self.path} to schema v{version}")
+
+        self.data.update(data)
+        self.loaded = True
+        if migrated:
+            self.save_now()
+        return self.data
+
+    def save(self):
+        """Schedules a debounced save; falls back to a blocking write when no loop is running."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save_now()
+            return
+        if self._load_failed:
+            logger.error(f"Not saving config: {self.path} failed to load")
+            return
+        self._dirty = True
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        # A save() while a write is in progress lands after its snapshot; go round again for it
+        while self._dirty:
+            await asyncio.sleep(self.delay)
+            await self.flush()
+
+    async def flush(self):
+        """Writes pending changes, if there are any."""
+        async with self._lock:
+            if not self._dirty or self._load_failed:
+                return
+            # Serialize on the loop so the snapshot is consistent, write in a thread
+            self._dirty = False
+            snapshot = self._serialize()
+            try:
+                await asyncio.to_thread(self._write, snapshot)
+            except Exception as e:
+                logger.error(f"Failed to save config: {e}")
+
+    def save_now(self):
+        if self._load_failed:
+            logger.error(f"Not saving config: {self.path} failed to load")
+            return
+        self._dirty = False
+        try:
+            self._write(self._serialize())
+        except Exception as e:
+            logger.error(f"Failed to save config: {e}")
+
+    def _serialize(self):
+        return json.dumps({"version": CONFIG_VERSION, **self.data}, indent=2)
+
+    def _write(self, snapshot):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(snapshot)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    async def close(self):
+        """Cancels a pending debounced save and writes any pending changes immediately."""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
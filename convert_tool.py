@@ -1,24 +1,97 @@
-import re
+import argparse
+import hashlib
 import json
+import os
+import re
+from corpus import CorpusWriter, iter_entries
 
-input_file = "source.txt"
-output_file = "responses.json"
+# 按“数字+点”切割，如 1.  2.  10.
+ENTRY_NUMBER = re.compile(r'\s*\d+\.\s*')
 
-with open(input_file, "r", encoding="utf-8") as f:
-    raw = f.read()
+def entry_hash(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
 
-# 关键一步：
-# 把“换行 + 周围的空格”全部删掉
-# 比如 "今天运气爆棚！ \n 2. 不要放弃" -> "今天运气爆棚！2. 不要放弃"
-clean = re.sub(r'\s*\n\s*', '', raw)
+def load_state(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
 
-# 按“数字+点”切割，如 1.  2.  10.
-parts = re.split(r'\s*\d+\.\s*', clean)
+def save_state(path, state):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+def parse_entries(f, offset, pending="", final=True):
+    """
+    Streams finished entries from the source, starting at byte `offset` with `pending` being
+    the text of the entry a previous run stopped inside. Lines are glued together with the
+    newline and the spaces around it dropped (e.g. "今天运气爆棚！ \n 2. 不要放弃" ->
+    "今天运气爆棚！2. 不要放弃") and split on entry numbers; an entry is finished once the
+    next number appears. At the end of the source the last entry is yielded too unless
+    `final` is false, in which case it and any line without its newline yet are left for a
+    later run. Returns (offset, pending) to resume from, always at a line boundary.
+    """
+    f.seek(offset)
+    for raw in f:
+        if not raw.endswith(b"\n") and not final:
+            break
+        offset += len(raw)
+        parts = ENTRY_NUMBER.split(pending + raw.decode("utf-8").strip())
+        for part in parts[:-1]:
+            yield part.strip()
+        pending = parts[-1]
+    if final and pending.strip():
+        # Kept as pending as well: if a later run finds it continued, the whole entry is re-yielded
+        yield pending.strip()
+    return offset, pending
+
+def convert(source, base, state_path, final=True):
+    state = load_state(state_path)
+    offset = state.get("offset", 0)
+    pending = state.get("pending", "")
+    if os.path.getsize(source) < offset:
+        # The source was rewritten rather than appended to; dedup keeps the re-read cheap
+        offset, pending = 0, ""
+
+    seen = {entry_hash(entry) for entry in iter_entries(base)}
+    writer = CorpusWriter(base)
+    added = duplicates = 0
+    try:
+        with open(source, "rb") as f:
+            entries = parse_entries(f, offset, pending, final)
+            while True:
+                try:
+                    entry = next(entries)
+                except StopIteration as done:
+                    offset, pending = done.value
+                    break
+                if not entry:
+                    continue
+                digest = entry_hash(entry)
+                if digest in seen:
+                    duplicates += 1
+                    continue
+                seen.add(digest)
+                writer.append(entry)
+                added += 1
+    finally:
+        writer.close()
+    save_state(state_path, {"offset": offset, "pending": pending})
+    return added, duplicates, writer.count
 
-# 去掉空串，strip 前后空格
-messages = [p.strip() for p in parts if p.strip()]
+def main():
+    parser = argparse.ArgumentParser(description="Appends new numbered entries from a text file to a response corpus")
+    parser.add_argument("source", nargs="?", default="source.txt")
+    parser.add_argument("--output", default="responses", help="corpus base name (writes <base>.corpus and <base>.idx)")
+    parser.add_argument("--partial", action="store_true",
+                        help="the source is still being written: hold its last entry back until a later run")
+    args = parser.parse_args()
 
-with open(output_file, "w", encoding="utf-8") as f:
-    json.dump(messages, f, ensure_ascii=False, indent=2)
+    added, duplicates, total = convert(args.source, args.output, args.output + ".state", final=not args.partial)
+    print(f"Added {added} new entries ({duplicates} duplicates skipped); {args.output} now has {total} entries.")
 
-print(json.dumps(messages, ensure_ascii=False, indent=2))
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+import array
+import mmap
+import os
+import sys
+
+# On-disk corpus: "<base>.corpus" holds the UTF-8 entries back to back and "<base>.idx"
+# holds each entry's end offset as a little-endian uint64, so entry i is
+# blob[end[i - 1]:end[i]]. Both files are only ever appended to.
+
+def corpus_paths(base):
+    return base + ".corpus", base + ".idx"
+
+def _read_ends(index_path):
+    ends = array.array("Q")
+    with open(index_path, "rb") as f:
+        data = f.read()
+    # A crash mid-append can leave a partial record; it was never committed
+    ends.frombytes(data[:len(data) - len(data) % ends.itemsize])
+    if sys.byteorder == "big":
+        ends.byteswap()
+    return ends
+
+def _map(path):
+    with open(path, "rb") as f:
+        # mmap can't map an empty file
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else None
+
+class Corpus:
+    """
+    Read-only, memory-mapped view of a corpus. Processes mapping the same files share
+    their pages; a lookup is one offset read and one slice decode. Supports len() and
+    indexing, so random.choice works.
+    """
+
+    def __init__(self, base):
+        self.blob_path, self.index_path = corpus_paths(base)
+        self._blob = _map(self.blob_path) or b""
+        self._index = _map(self.index_path)
+        if self._index is None:
+            self._ends = array.array("Q")
+        elif sys.byteorder == "little":
+            # Cast the mapping in place rather than copying the offsets
+            self._ends = memoryview(self._index)[:len(self._index) // 8 * 8].cast("Q")
+        else:
+            self._ends = _read_ends(self.index_path)
+        if len(self._ends) and self._ends[-1] > len(self._blob):
+            self.close()
+            raise ValueError(f"{self.index_path} points past the end of {self.blob_path}")
+
+    def __len__(self):
+        return len(self._ends)
+
+    def __getitem__(self, i):
+        start = self._ends[i - 1] if i > 0 else 0
+        return self._blob[start:self._ends[i]].decode("utf-8")
+
+    def close(self):
+        if isinstance(self._ends, memoryview):
+            self._ends.release()
+        for mapping in (self._blob, self._index):
+            if isinstance(mapping, mmap.mmap):
+                mapping.close()
+
+def iter_entries(base):
+    """Streams every committed entry in order without loading the blob."""
+    blob_path, index_path = corpus_paths(base)
+    if not os.path.exists(index_path):
+        return
+    start = 0
+    with open(blob_path, "rb") as f:
+        for end in _read_ends(index_path):
+            yield f.read(end - start).decode("utf-8")
+            start = end
+
+def build_corpus(base, entries):
+    """Writes a fresh corpus from `entries`, replacing any existing one (readers keep their old mapping)."""
+    blob_path, index_path = corpus_paths(base)
+    suffix = f".{os.getpid()}.tmp"
+    ends = array.array("Q")
+    size = 0
+    with open(blob_path + suffix, "wb") as f:
+        for entry in entries:
+            data = entry.encode("utf-8")
+            f.write(data)
+            size += len(data)
+            ends.append(size)
+        f.flush()
+        os.fsync(f.fileno())
+    if sys.byteorder == "big":
+        ends.byteswap()
+    with open(index_path + suffix, "wb") as f:
+        f.write(ends.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    # A reader opening the pair between these renames can see mismatched files; the index
+    # rename moves its mtime, so ResponsePool picks up the finished pair on its next reload
+    os.replace(blob_path + suffix, blob_path)
+    os.replace(index_path + suffix, index_path)
+    return len(ends)
+
+class CorpusWriter:
+    """Appends entries to a corpus; nothing is visible to readers until commit()."""
+
+    def __init__(self, base):
+        self.blob_path, self.index_path = corpus_paths(base)
+        ends = _read_ends(self.index_path) if os.path.exists(self.index_path) else array.array("Q")
+        self.size = ends[-1] if ends else 0
+        self.count = len(ends)
+        # Drop anything a crashed run wrote past the last committed entry
+        for path, length in ((self.blob_path, self.size), (self.index_path, len(ends) * ends.itemsize)):
+            with open(path, "ab") as f:
+                f.truncate(length)
+        self._pending = array.array("Q")
+        self._blob = open(self.blob_path, "ab")
+
+    def append(self, text):
+        data = text.encode("utf-8")
+        self._blob.write(data)
+        self.size += len(data)
+        self._pending.append(self.size)
+
+    def commit(self):
+        if not self._pending:
+            return
+        self._blob.flush()
+        os.fsync(self._blob.fileno())
+        pending, self._pending = self._pending, array.array("Q")
+        if sys.byteorder == "big":
+            pending.byteswap()
+        with open(self.index_path, "ab") as f:
+            f.write(pending.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self.count += len(pending)
+
+    def close(self):
+        self.commit()
+        self._blob.close()
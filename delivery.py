@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+import aiohttp
+import asyncio
+import discord
+import logging
+import metrics
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_SECONDS = metrics.histogram("delivery_latency_seconds", "Time to deliver one message, retries included")
+
+def is_retryable(error):
+    """Transient failures worth another attempt; missing access or a deleted channel is not."""
+    if isinstance(error, (discord.Forbidden, discord.NotFound)):
+        return False
+    if isinstance(error, discord.HTTPException):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientError, OSError))
+
+class DeliveryScheduler:
+    """
+    Fans messages out to many channels at once. Each channel's jobs run in order (so reviews
+    arrive oldest first), different channels run in parallel up to `max_concurrency`, and
+    discord.py's HTTP client paces each route's rate-limit bucket, so no fixed sleeps.
+    """
+
+    def __init__(self, max_concurrency=10, max_retries=3, base_delay=1.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(self, deliveries):
+        """
+        deliveries: {channel: [(label, send), ...]} where send is an async callable.
+        Returns one result dict per job: channel_id, label, ok, attempts, latency (seconds).
+        """
+        started = time.monotonic()
+        per_channel = await asyncio.gather(*(self._drain(channel, jobs) for channel, jobs in deliveries.items()))
+        results = [result for channel_results in per_channel for result in channel_results]
+
+        for result in results:
+            if result["attempts"]:
+                DELIVERY_SECONDS.observe(result["latency"], ok=str(result["ok"]).lower())
+
+        if results:
+            latencies = sorted(r["latency"] for r in results if r["ok"])
+            delivered = len(latencies)
+            p50 = latencies[delivered // 2] if latencies else 0
+            worst = latencies[-1] if latencies else 0
+            logger.info(
+                f"Delivered {delivered}/{len(results)} messages to {len(deliveries)} channels "
+                f"in {time.monotonic() - started:.1f}s (p50 {p50:.2f}s, max {worst:.2f}s)"
+            )
+        return results
+
+    async def _drain(self, channel, jobs):
+        results = []
+        channel_dead = False
+        for label, send in jobs:
+            if channel_dead:
+                results.append({"channel_id": channel.id, "label": label, "ok": False, "attempts": 0, "latency": 0})
+                continue
+            result = await self._attempt(channel, label, send)
+            results.append(result)
+            # No point trying the rest of the queue once the channel is gone or forbidden
+            channel_dead = result.pop("channel_dead")
+        return results
+
+    async def _attempt(self, channel, label, send):
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                async with self._semaphore:
+                    await send()
+                return {"channel_id": channel.id, "label": label, "ok": True, "attempts": attempt,
+                        "latency": time.monotonic() - started, "channel_dead": False}
+            except Exception as e:
+                retryable = is_retryable(e)
+                if not retryable or attempt > self.max_retries:
+                    logger.error(f"Failed to send {label} to channel {channel.id} after {attempt} attempt(s): {e}")
+                    return {"channel_id": channel.id, "label": label, "ok": False, "attempts": attempt,
+                            "latency": time.monotonic() - started,
+                            "channel_dead": isinstance(e, (discord.Forbidden, discord.NotFound))}
+                # Exponential backoff with jitter so retries from many channels don't line up
+                delay = self.base_delay * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                logger.warning(f"Retrying {label} to channel {channel.id} in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
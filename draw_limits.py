@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+import time
+from collections import OrderedDict, deque
+
+# config.json "draw_limits" section. A bucket with burst or per_minute <= 0 is disabled;
+# no_repeat is how many of a channel's recent draws a new draw avoids (0 = off).
+DEFAULT_DRAW_LIMITS = {
+    "user": {"burst": 5, "per_minute": 12},
+    "guild": {"burst": 30, "per_minute": 120},
+    "no_repeat": 0,
+}
+
+class RateLimiter:
+    """
+    Token buckets keyed by any hashable (user ID, guild ID). Each key holds up to `burst`
+    tokens and regains `per_minute` of them per minute. Only the `max_keys` most recently
+    used keys are kept; an evicted key comes back with a full bucket, as if it had been idle.
+    """
+
+    def __init__(self, burst, per_minute, max_keys=10000):
+        self.burst = burst
+        self.rate = per_minute / 60
+        self.max_keys = max_keys
+        self._buckets = OrderedDict() # key -> [tokens, updated_at], least recently used first
+
+    def _bucket(self, key, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.burst), now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        return bucket
+
+    def wait_time(self, key, now):
+        """Seconds until `key` has a token (0 if it has one now); doesn't take it."""
+        tokens = self._bucket(key, now)[0]
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def take(self, key, now):
+        self._bucket(key, now)[0] -= 1
+
+class DrawLimits:
+    """
+    Limits for the random-draw commands: a per-user and a per-guild token bucket, and an
+    optional per-channel memory of the last `no_repeat` draws so they aren't repeated.
+    """
+
+    def __init__(self, user=None, guild=None, no_repeat=0, max_channels=10000):
+        self.user = user
+        self.guild = guild
+        self.no_repeat = no_repeat
+        self.max_channels = max_channels
+        self._recent = OrderedDict() # (pool name, channel_id) -> deque of recent indices
+
+    @classmethod
+    def from_config(cls, config):
+        def limiter(name):
+            settings = {**DEFAULT_DRAW_LIMITS[name], **config.get(name, {})}
+            if settings["burst"] <= 0 or settings["per_minute"] <= 0:
+                return None
+            return RateLimiter(settings["burst"], settings["per_minute"])
+
+        return cls(user=limiter("user"), guild=limiter("guild"),
+                   no_repeat=config.get("no_repeat", DEFAULT_DRAW_LIMITS["no_repeat"]))
+
+    def acquire(self, user_id, guild_id=None, now=None):
+        """
+        Takes a token from the user's and the guild's bucket and returns 0, or returns the
+        seconds to wait (taking nothing) if either is empty. DMs only count against the user.
+        """
+        now = time.monotonic() if now is None else now
+        buckets = [(limiter, key) for limiter, key in ((self.user, user_id), (self.guild, guild_id))
+                   if limiter is not None and key is not None]
+        wait = max((limiter.wait_time(key, now) for limiter, key in buckets), default=0.0)
+        if not wait:
+            for limiter, key in buckets:
+                limiter.take(key, now)
+        return wait
+
+    def recent(self, pool_name, channel_id):
+        """The ring buffer of a channel's recent draws from a pool, or None when no_repeat is off."""
+        if self.no_repeat <= 0:
+            return None
+        key = (pool_name, channel_id)
+        recent = self._recent.get(key)
+        if recent is None:
+            recent = self._recent[key] = deque(maxlen=self.no_repeat)
+            if len(self._recent) > self.max_channels:
+                self._recent.popitem(last=False)
+        else:
+            self._recent.move_to_end(key)
+        return recent
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from storage import open_db
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leader_wakeups (
+    name TEXT PRIMARY KEY,
+    requested_at REAL NOT NULL
+);
+"""
+
+class LeaderLease:
+    """
+    Leader election between processes sharing one SQLite file. The holder of the `name`
+    lease renews it every `renew_interval` seconds; if it stops (crash, hang), any other
+    process can take it over once `ttl` seconds have passed.
+    """
+
+    def __init__(self, path, name, ttl=60, renew_interval=15):
+        self.name = name
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._task = None
+        self._lock = threading.Lock()
+        self._conn = open_db(path)
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def _try_acquire(self):
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two processes can't both win
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT holder, expires_at FROM leases WHERE name = ?", (self.name,)).fetchone()
+                acquired = row is None or row["holder"] == self.holder or row["expires_at"] < now
+                if acquired:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)",
+                        (self.name, self.holder, now + self.ttl)
+                    )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return acquired
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                leader = await asyncio.to_thread(self._try_acquire)
+            except Exception as e:
+                logger.error(f"Failed to renew {self.name} lease: {e}")
+                leader = False
+            if leader != self.is_leader:
+                logger.info(f"{'Acquired' if leader else 'Lost'} {self.name} lease ({self.holder})")
+            self.is_leader = leader
+            await asyncio.sleep(self.renew_interval)
+
+    async def request_wakeup(self):
+        """Asks whichever process holds the lease to act now (see consume_wakeup)."""
+        await asyncio.to_thread(self._execute,
+            "INSERT OR REPLACE INTO leader_wakeups (name, requested_at) VALUES (?, ?)", (self.name, time.time()))
+
+    async def consume_wakeup(self):
+        return await asyncio.to_thread(self._execute, "DELETE FROM leader_wakeups WHERE name = ?", (self.name,)) > 0
+
+    def _execute(self, sql, params):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params).rowcount
+
+    async def release(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.is_leader:
+            # Lets another process take over right away instead of waiting out the ttl
+            await asyncio.to_thread(self._execute,
+                "DELETE FROM leases WHERE name = ? AND holder = ?", (self.name, self.holder))
+            self.is_leader = False
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import metrics
+from storage import open_db
+
+logger = logging.getLogger(__name__)
+
+WRITE_SECONDS = metrics.histogram("log_write_seconds", "Time to write one batch of log entries")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS message_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    content TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    requester TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS message_logs_requester ON message_logs (requester, id);
+CREATE INDEX IF NOT EXISTS message_logs_channel ON message_logs (channel, id);
+CREATE INDEX IF NOT EXISTS message_logs_timestamp ON message_logs (timestamp);
+"""
+
+class LogStore:
+    """
+    Append-only log of messages the bot sent. log() only queues the entry; a background
+    task writes the queue in one transaction every `flush_interval` seconds, and trims
+    rows beyond `retention` every `compact_interval` seconds.
+    """
+
+    def __init__(self, path, retention=1000, flush_interval=2, compact_interval=300):
+        self.path = path
+        self.retention = retention
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self._pending = []
+        self._lock = threading.Lock()
+        self._task = None
+        self._conn = open_db(path)
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def log(self, entry):
+        """Queues an entry ({timestamp, content, channel, requester}); never blocks."""
+        self._pending.append(entry)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        last_compact = time.monotonic()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.monotonic() - last_compact >= self.compact_interval:
+                    await asyncio.to_thread(self._compact)
+                    last_compact = time.monotonic()
+            except Exception as e:
+                logger.error(f"Failed to write log: {e}")
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        await asyncio.to_thread(self._write, batch)
+
+    def _write(self, batch):
+        rows = [(e["timestamp"], e["content"], e["channel"], e["requester"]) for e in batch]
+        with WRITE_SECONDS.time(), self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO message_logs (timestamp, content, channel, requester) VALUES (?, ?, ?, ?)", rows
+            )
+
+    def _compact(self):
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM message_logs WHERE id <= (SELECT MAX(id) FROM message_logs) - ?", (self.retention,)
+                )
+            # Fold the WAL back into the main file so it doesn't grow between restarts
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    async def page(self, requester=None, channel=None, since=None, until=None,
+                   before_id=None, after_id=None, limit=20):
+        """
+        One page of entries matching the filters (since/until are ISO timestamps), newest
+        first, plus whether more entries exist past it. Pass before_id to page towards older
+        entries or after_id towards newer ones; each page reads only its own rows.
+        """
+        return await asyncio.to_thread(self._page, requester, channel, since, until, before_id, after_id, limit)
+
+    def _page(self, requester, channel, since, until, before_id, after_id, limit):
+        clauses, params = [], []
+        for clause, value in (("requester = ?", requester), ("channel = ?", channel),
+                              ("timestamp >= ?", since), ("timestamp < ?", until),
+                              ("id < ?", before_id), ("id > ?", after_id)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        # Walking towards newer entries reads ascending from the cursor, then flips
+        order = "ASC" if after_id is not None else "DESC"
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, timestamp, content, channel, requester FROM message_logs {where} "
+                f"ORDER BY id {order} LIMIT ?", (*params, limit + 1)
+            ).fetchall()
+
+        has_more = len(rows) > limit
+        entries = [dict(row) for row in rows[:limit]]
+        if after_id is not None:
+            entries.reverse()
+        return entries, has_more
+
+    def import_json(self, json_path):
+        """One-time migration from the old JSON-array log file; renames it once imported."""
+        if not os.path.exists(json_path):
+            return
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                logs = json.load(f)
+            self._write(logs[-self.retention:])
+            os.replace(json_path, json_path + ".migrated")
+            logger.info(f"Imported {len(logs)} log entries from {json_path}")
+        except Exception as e:
+            logger.error(f"Failed to import {json_path}: {e}")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# Minimal Prometheus-style metrics: one process-wide registry of counters, gauges and
+# histograms, exposed in the text format by render() / the optional HTTP endpoint.
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registry = {}
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def total(self):
+        return sum(self._values.values())
+
+    def label_values(self, label):
+        return sorted({dict(key).get(label) for key in self._values} - {None})
+
+    def samples(self):
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(key)} {value}"
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        self._values[_label_key(labels)] = value
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series = {} # label key -> [bucket counts..., count, sum]
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        series[-2] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def summary(self, **labels):
+        """count, mean and an upper-bound p95 estimate, merged over series matching `labels`."""
+        wanted = set(labels.items())
+        merged = [0] * (len(self.buckets) + 2)
+        for key, series in self._series.items():
+            if wanted <= set(key):
+                merged = [a + b for a, b in zip(merged, series)]
+        count, total = merged[-2], merged[-1]
+        if not count:
+            return {"count": 0, "mean": 0, "p95": 0}
+        p95 = float("inf")
+        seen = 0
+        for bound, bucket in zip(self.buckets, merged):
+            seen += bucket
+            if seen >= 0.95 * count:
+                p95 = bound
+                break
+        return {"count": count, "mean": total / count, "p95": p95}
+
+    def label_values(self, label):
+        return sorted({dict(key).get(label) for key in self._series} - {None})
+
+    def samples(self):
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, series):
+                cumulative += bucket
+                yield f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {series[-2]}"
+            yield f"{self.name}_count{_format_labels(key)} {series[-2]}"
+            yield f"{self.name}_sum{_format_labels(key)} {series[-1]}"
+
+def _register(cls, name, help, **kwargs):
+    metric = _registry.get(name)
+    if metric is None:
+        metric = _registry[name] = cls(name, help, **kwargs)
+    return metric
+
+def counter(name, help):
+    return _register(Counter, name, help)
+
+def gauge(name, help):
+    return _register(Gauge, name, help)
+
+def histogram(name, help, buckets=DEFAULT_BUCKETS):
+    return _register(Histogram, name, help, buckets=buckets)
+
+def render():
+    lines = []
+    for metric in _registry.values():
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+LOOP_LAG = gauge("event_loop_lag_seconds", "How late the last event-loop lag probe woke up")
+LOOP_LAG_HISTOGRAM = histogram("event_loop_lag_probe_seconds", "Event-loop lag per probe")
+
+async def monitor_loop_lag(interval=1.0):
+    """Sleeps `interval` seconds at a time; any oversleep is time the loop was blocked."""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(0.0, time.perf_counter() - started - interval)
+        LOOP_LAG.set(lag)
+        LOOP_LAG_HISTOGRAM.observe(lag)
+
+async def start_http_server(port, host="127.0.0.1"):
+    """Serves render() at http://host:port/metrics. Returns the aiohttp runner (call cleanup() to stop)."""
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+    return runner
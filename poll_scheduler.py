@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+import asyncio
+import random
+import time
+
+class AdaptivePollScheduler:
+    """
+    Decides when each professor is polled next. A poll that finds new reviews drops that
+    professor to `min_interval` (reviews come in bursts); a quiet poll or an error multiplies
+    the interval by `backoff`, up to `max_interval`. Every interval gets +/- `jitter` so
+    professors drift apart instead of all landing on the same tick.
+    """
+
+    def __init__(self, min_interval=120, base_interval=600, max_interval=7200, backoff=2.0, jitter=0.1):
+        self.min_interval = min_interval
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self._interval = {} # key -> current interval (seconds)
+        self._due = {} # key -> monotonic time of the next poll
+        self._force = False
+        self._wakeup = asyncio.Event()
+
+    def sync(self, keys):
+        """Tracks exactly `keys`: new ones are due immediately, removed ones are dropped."""
+        keys = set(keys)
+        now = time.monotonic()
+        for key in keys - self._due.keys():
+            self._interval[key] = self.base_interval
+            self._due[key] = now
+        for key in self._due.keys() - keys:
+            del self._due[key]
+            del self._interval[key]
+
+    def due(self):
+        now = time.monotonic()
+        if self._force:
+            self._force = False
+            return list(self._due)
+        return [key for key, due_at in self._due.items() if due_at <= now]
+
+    def record(self, key, outcome):
+        """outcome is "new", "unchanged" or "error"."""
+        if key not in self._interval:
+            return
+        if outcome == "new":
+            interval = self.min_interval
+        else:
+            interval = min(self._interval[key] * self.backoff, self.max_interval)
+        self._interval[key] = interval
+        self._due[key] = time.monotonic() + interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def next_poll_in(self, key):
+        """Seconds until `key` is polled next, or None if it isn't tracked."""
+        if key not in self._due:
+            return None
+        return max(0.0, self._due[key] - time.monotonic())
+
+    def wake(self):
+        """Polls everything as soon as the current poll (if any) finishes."""
+        self._force = True
+        self._wakeup.set()
+
+    def nudge(self):
+        """Re-checks the schedule now, e.g. after subscriptions changed."""
+        self._wakeup.set()
+
+    async def wait(self, max_wait=None):
+        """Sleeps until the next professor is due, until wake()/nudge(), or at most `max_wait` seconds."""
+        timeout = max_wait
+        if self._due:
+            until_due = max(0.0, min(self._due.values()) - time.monotonic())
+            timeout = until_due if timeout is None else min(timeout, until_due)
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import logging
+import os
+import random
+from corpus import Corpus, build_corpus, corpus_paths
+
+logger = logging.getLogger(__name__)
+
+class ResponsePool:
+    """
+    Strings for random draws, served from a memory-mapped corpus (see corpus.py) so that
+    bot processes share one copy and nothing is parsed per draw. The corpus lives next to
+    the JSON file (responses.json -> responses.corpus/.idx). A corpus that convert_tool.py
+    maintains (it has a <base>.state file) is its own source of truth; otherwise it's
+    rebuilt from the JSON whenever the JSON file is newer. Commands only call choice();
+    reload_if_changed() reopens the corpus when either file's mtime moves.
+    """
+
+    def __init__(self, path, missing_message):
+        self.path = path
+        self.corpus_base = os.path.splitext(path)[0]
+        self.index_path = corpus_paths(self.corpus_base)[1]
+        self.state_path = self.corpus_base + ".state"
+        self.missing_message = missing_message
+        self.items = [missing_message]
+        self._mtimes = None
+        self._apply(self._load())
+
+    def _stat(self):
+        mtimes = []
+        for path in (self.path, self.index_path):
+            try:
+                mtimes.append(os.path.getmtime(path))
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def _load(self):
+        """Rebuilds the corpus if it's stale and opens it; blocking, so reload() runs it in a thread."""
+        try:
+            json_mtime, index_mtime = self._stat()
+            owned = os.path.exists(self.state_path)
+            if json_mtime is not None and not owned and (index_mtime is None or json_mtime > index_mtime):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    count = build_corpus(self.corpus_base, json.load(f))
+                logger.info(f"Rebuilt corpus {self.index_path} from {self.path} ({count} entries)")
+            mtimes = self._stat()
+            return Corpus(self.corpus_base), mtimes
+        except FileNotFoundError:
+            return None, None
+        except (OSError, ValueError) as e:
+            # Keep serving the previous pool rather than a half-written file
+            logger.error(f"Failed to reload {self.path}: {e}")
+            return self.items, self._mtimes
+
+    def _apply(self, loaded):
+        items, mtimes = loaded
+        if items is self.items:
+            return
+        if items is None:
+            self._replace([self.missing_message])
+            self._mtimes = None
+            return
+        self._replace(items if len(items) else [self.missing_message])
+        self._mtimes = mtimes
+        logger.info(f"Loaded {len(self.items)} entries from {self.index_path}")
+
+    def _replace(self, items):
+        old, self.items = self.items, items
+        if isinstance(old, Corpus):
+            old.close()
+
+    async def reload(self):
+        # The swap happens back on the event loop, so no draw ever sees a closed corpus
+        self._apply(await asyncio.to_thread(self._load))
+
+    async def reload_if_changed(self):
+        """Returns True if the files changed and the pool was reloaded."""
+        if self._stat() == self._mtimes:
+            return False
+        await self.reload()
+        return True
+
+    def choice(self, recent=None, attempts=8):
+        """
+        A random entry. With `recent` (a deque of indices), redraws a few times to avoid
+        anything in it and records the pick there.
+        """
+        if recent is None:
+            return random.choice(self.items)
+        n = len(self.items)
+        for _ in range(attempts):
+            index = random.randrange(n)
+            if index not in recent:
+                break
+        recent.append(index)
+        return self.items[index]
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import threading
+from review_model import Review
+from storage import open_db
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS review_archive (
+    professor_id INTEGER NOT NULL,
+    review_id TEXT NOT NULL,
+    posted_at INTEGER,
+    fields TEXT NOT NULL,
+    PRIMARY KEY (professor_id, review_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS review_archive_posted ON review_archive (professor_id, posted_at);
+CREATE TABLE IF NOT EXISTS review_archive_complete (
+    professor_id INTEGER PRIMARY KEY
+);
+"""
+
+# Review slots kept in the JSON `fields` column; id and posted_at have columns of their own
+ARCHIVED_FIELDS = tuple(field for field in Review.__slots__ if field not in ("id", "posted_at"))
+
+class ReviewArchive:
+    """
+    Every review the bot has fetched, keyed by (professor_id, review_id), so catch-up after
+    downtime and /mynewsanrr lookups can be answered locally instead of from RMP. A
+    professor is marked complete once their full history has been paged in; until then
+    (or after a gap, which clears the mark) the archive can't stand in for RMP.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = open_db(path)
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+
+    async def add(self, professor_id, reviews):
+        rows = [
+            (professor_id, review.id, review.posted_at,
+             json.dumps({field: getattr(review, field) for field in ARCHIVED_FIELDS}, ensure_ascii=False))
+            for review in reviews
+        ]
+        if rows:
+            await asyncio.to_thread(self._add, rows)
+
+    def _add(self, rows):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO review_archive (professor_id, review_id, posted_at, fields) VALUES (?, ?, ?, ?)",
+                rows
+            )
+
+    async def review_ids(self, professor_id):
+        return await asyncio.to_thread(self._review_ids, professor_id)
+
+    def _review_ids(self, professor_id):
+        with self._lock:
+            rows = self._conn.execute("SELECT review_id FROM review_archive WHERE professor_id = ?", (professor_id,))
+            return {row[0] for row in rows}
+
+    async def complete(self):
+        """IDs of the professors whose archived history has no gaps."""
+        return await asyncio.to_thread(self._complete)
+
+    def _complete(self):
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT professor_id FROM review_archive_complete")}
+
+    async def set_complete(self, professor_id, complete=True):
+        if complete:
+            statement = "INSERT OR IGNORE INTO review_archive_complete (professor_id) VALUES (?)"
+        else:
+            statement = "DELETE FROM review_archive_complete WHERE professor_id = ?"
+        await asyncio.to_thread(self._execute, statement, (professor_id,))
+
+    def _execute(self, statement, params):
+        with self._lock, self._conn:
+            self._conn.execute(statement, params)
+
+    async def recent(self, professor_id, since):
+        """Archived reviews posted at or after `since` (epoch seconds), newest first."""
+        return await asyncio.to_thread(self._recent, professor_id, since)
+
+    def _recent(self, professor_id, since):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT review_id, posted_at, fields FROM review_archive "
+                "WHERE professor_id = ? AND posted_at >= ? ORDER BY posted_at DESC",
+                (professor_id, since)
+            ).fetchall()
+        reviews = []
+        for review_id, posted_at, fields in rows:
+            fields = json.loads(fields)
+            fields["tags"] = tuple(fields.get("tags") or ())
+            reviews.append(Review(review_id, posted_at=posted_at, **fields))
+        return reviews
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
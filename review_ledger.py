@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+import asyncio
+import threading
+from datetime import datetime, timezone
+from storage import open_db
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sent_reviews (
+    channel_id INTEGER NOT NULL,
+    review_id TEXT NOT NULL,
+    sent_at TEXT NOT NULL,
+    PRIMARY KEY (channel_id, review_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ledger_backfills (
+    channel_id INTEGER PRIMARY KEY,
+    backfilled_at TEXT NOT NULL
+);
+"""
+
+class ReviewLedger:
+    """Which reviews have been posted to which channel, keyed by (channel_id, review_id)."""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = open_db(path)
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+
+    async def record(self, channel_id, review_id):
+        await asyncio.to_thread(self._record_many, channel_id, [review_id])
+
+    def _record_many(self, channel_id, review_ids):
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO sent_reviews (channel_id, review_id, sent_at) VALUES (?, ?, ?)",
+                [(channel_id, rid, now) for rid in review_ids]
+            )
+
+    async def sent_ids(self, channel_id):
+        return await asyncio.to_thread(self._sent_ids, channel_id)
+
+    def _sent_ids(self, channel_id):
+        with self._lock:
+            rows = self._conn.execute("SELECT review_id FROM sent_reviews WHERE channel_id = ?", (channel_id,))
+            return {row[0] for row in rows}
+
+    async def needs_backfill(self, channel_id):
+        return await asyncio.to_thread(self._needs_backfill, channel_id)
+
+    def _needs_backfill(self, channel_id):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM ledger_backfills WHERE channel_id = ?", (channel_id,)).fetchone()
+        return row is None
+
+    async def backfill(self, channel_id, review_ids):
+        """Records reviews found in channel history and marks the channel as backfilled."""
+        await asyncio.to_thread(self._backfill, channel_id, list(review_ids))
+
+    def _backfill(self, channel_id, review_ids):
+        self._record_many(channel_id, review_ids)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ledger_backfills (channel_id, backfilled_at) VALUES (?, ?)",
+                (channel_id, datetime.now(timezone.utc).isoformat())
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+from calendar import timegm
+from datetime import datetime
+from functools import lru_cache
+
+@lru_cache(maxsize=4096)
+def parse_rmp_date(text):
+    """Epoch seconds for an RMP date like "2025-12-25 23:17:27 +0000 UTC", or None if it can't be read."""
+    if not text:
+        return None
+    try:
+        # Fixed-width fast path; strptime is only the fallback for a changed format. Building
+        # the datetime rejects impossible dates (e.g. Feb 30) just as strptime would
+        if len(text) >= 25 and text[4] == "-" and text[10] == " " and text[19] == " " and text[20] in "+-":
+            seconds = timegm(datetime(int(text[0:4]), int(text[5:7]), int(text[8:10]),
+                                      int(text[11:13]), int(text[14:16]), int(text[17:19])).timetuple())
+            offset = int(text[21:23]) * 3600 + int(text[23:25]) * 60
+            return seconds - offset if text[20] == "+" else seconds + offset
+        return int(datetime.strptime(text.replace(" UTC", ""), "%Y-%m-%d %H:%M:%S %z").timestamp())
+    except ValueError:
+        return None
+
+def parse_tags(text):
+    """RMP packs a review's tags into one "Tough grader--Lots of homework" string."""
+    return tuple(tag.strip() for tag in (text or "").split("--") if tag.strip())
+
+class Review:
+    """
+    One RMP rating, parsed once from its GraphQL node. `posted_at` is epoch seconds (UTC,
+    None if the date couldn't be read) so date filters are integer comparisons; `date`
+    keeps RMP's original string for display.
+    """
+
+    __slots__ = ("id", "comment", "date", "posted_at", "course", "quality", "difficulty", "attendance",
+                 "would_take_again", "grade", "tags", "online", "for_credit", "thumbs_up", "thumbs_down",
+                 "textbook_use")
+
+    def __init__(self, id, comment=None, date=None, posted_at=None, course=None, quality=None, difficulty=None,
+                 attendance=None, would_take_again=None, grade=None, tags=(), online=None, for_credit=None,
+                 thumbs_up=None, thumbs_down=None, textbook_use=None):
+        self.id = id
+        self.comment = comment
+        self.date = date
+        self.posted_at = parse_rmp_date(date) if posted_at is None else posted_at
+        self.course = course
+        self.quality = quality
+        self.difficulty = difficulty
+        self.attendance = attendance
+        self.would_take_again = would_take_again
+        self.grade = grade
+        self.tags = tags
+        self.online = online
+        self.for_credit = for_credit
+        self.thumbs_up = thumbs_up
+        self.thumbs_down = thumbs_down
+        self.textbook_use = textbook_use
+
+    @classmethod
+    def from_node(cls, node):
+        return cls(
+            node["id"],
+            comment=node.get("comment"),
+            date=node.get("date"),
+            course=node.get("class"),
+            quality=node.get("helpfulRating"),
+            difficulty=node.get("difficultyRating"),
+            attendance=node.get("attendanceMandatory"),
+            would_take_again=node.get("wouldTakeAgain"),
+            grade=node.get("grade"),
+            tags=parse_tags(node.get("ratingTags")),
+            online=node.get("isForOnlineClass"),
+            for_credit=node.get("isForCredit"),
+            thumbs_up=node.get("thumbsUpTotal"),
+            thumbs_down=node.get("thumbsDownTotal"),
+            textbook_use=node.get("textbookUse"),
+        )
+
+    def __repr__(self):
+        return f"Review({self.id!r}, date={self.date!r})"
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+import discord
+from collections import OrderedDict
+
+# Discord embed limits (characters)
+TITLE_LIMIT = 256
+DESCRIPTION_LIMIT = 4096
+FIELD_VALUE_LIMIT = 1024
+FOOTER_LIMIT = 2048
+
+def truncate(text, limit):
+    text = str(text)
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+def field_value(value):
+    # Discord rejects empty field values
+    if value is None or value == "":
+        return "N/A"
+    return truncate(value, FIELD_VALUE_LIMIT)
+
+class ReviewRenderer:
+    """
+    Builds each review's embed once and caches it by review ID, so the same embed is
+    reused for every subscribed channel and for /mynewsanrr backfills. Cached embeds
+    are shared: callers must not modify them.
+    """
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._cache = OrderedDict() # (review_id, professor_name) -> discord.Embed
+
+    def render(self, review, professor_name):
+        key = (review.id, professor_name)
+        embed = self._cache.get(key)
+        if embed is not None:
+            self._cache.move_to_end(key)
+            return embed
+
+        embed = self._build(review, professor_name)
+        self._cache[key] = embed
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return embed
+
+    def _build(self, review, professor_name):
+        embed = discord.Embed(
+            title=truncate(f"New Review for {professor_name}", TITLE_LIMIT),
+            description=truncate(review.comment or 'No comment provided.', DESCRIPTION_LIMIT),
+            color=discord.Color.red() if "Tough grader" in review.tags else discord.Color.green()
+        )
+
+        # Fields
+        embed.add_field(name="Class", value=field_value(review.course), inline=True)
+        embed.add_field(name="Date", value=field_value(review.date), inline=True)
+        embed.add_field(name="Grade", value=field_value(review.grade), inline=True)
+
+        # Ratings
+        embed.add_field(name="Difficulty", value=f"{'N/A' if review.difficulty is None else review.difficulty}/5", inline=True)
+        embed.add_field(name="Attendance", value=field_value(review.attendance), inline=True)
+        embed.add_field(name="Take Again", value="Yes" if review.would_take_again else "No", inline=True)
+
+        if review.tags:
+            embed.add_field(name="Tags", value=field_value("--".join(review.tags)), inline=False)
+
+        embed.set_footer(text=truncate(f"Review ID: {review.id}", FOOTER_LIMIT))
+        return embed
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+import asyncio
+import threading
+import time
+import numpy as np
+from review_model import Review, parse_tags
+from storage import open_db
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS review_stats (
+    professor_id INTEGER NOT NULL,
+    review_id TEXT NOT NULL,
+    posted_at INTEGER NOT NULL,
+    quality REAL,
+    difficulty REAL,
+    would_take_again INTEGER,
+    grade TEXT,
+    tags TEXT,
+    seq INTEGER NOT NULL, -- review_stats_version.version of the write that stored the row
+    PRIMARY KEY (professor_id, review_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS review_stats_seq ON review_stats (seq);
+CREATE TABLE IF NOT EXISTS review_stats_backfills (
+    professor_id INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS review_stats_version (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO review_stats_version (id, version) VALUES (0, 0);
+"""
+
+DAY = 86400
+RECENT_COUNTS = (10, 50) # "last N reviews" windows
+RECENT_DAYS = (90, 365) # "last N days" windows, answered from prefix sums at query time
+TREND_YEARS = 5
+TOP_TAGS = 10
+
+class Vocabulary:
+    """Interns strings (grades, tags) as small integer codes shared by every professor."""
+
+    def __init__(self):
+        self.names = []
+        self._codes = {}
+
+    def code(self, name):
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+class ProfessorColumns:
+    """
+    One professor's review history as parallel NumPy columns, kept sorted by posting time.
+    Tags are a flat (code, row) pair of columns since reviews carry any number of them.
+    """
+
+    def __init__(self):
+        self.review_ids = set()
+        self.posted_at = np.empty(0, np.int64)
+        self.quality = np.empty(0, np.float32)
+        self.difficulty = np.empty(0, np.float32)
+        self.would_take_again = np.empty(0, np.int8) # 1 / 0, or -1 when not answered
+        self.grade = np.empty(0, np.int16) # Vocabulary code, or -1 when not given
+        self.tag_codes = np.empty(0, np.int16)
+        self.tag_rows = np.empty(0, np.int32)
+        self.summary = None
+
+    def __len__(self):
+        return len(self.posted_at)
+
+    def append(self, rows, tags):
+        """rows: [(posted_at, quality, difficulty, would_take_again, grade)]; tags: [(code, row offset)]."""
+        base = len(self)
+        posted_at, quality, difficulty, would_take_again, grade = zip(*rows)
+        self.posted_at = np.concatenate([self.posted_at, np.array(posted_at, np.int64)])
+        self.quality = np.concatenate([self.quality, np.array(quality, np.float32)])
+        self.difficulty = np.concatenate([self.difficulty, np.array(difficulty, np.float32)])
+        self.would_take_again = np.concatenate([self.would_take_again, np.array(would_take_again, np.int8)])
+        self.grade = np.concatenate([self.grade, np.array(grade, np.int16)])
+        if tags:
+            codes, offsets = zip(*tags)
+            self.tag_codes = np.concatenate([self.tag_codes, np.array(codes, np.int16)])
+            self.tag_rows = np.concatenate([self.tag_rows, np.array(offsets, np.int32) + base])
+
+        # Polls append oldest-first after the existing rows; backfills arrive newest-first and need a reorder
+        if np.any(np.diff(self.posted_at[max(base - 1, 0):]) < 0):
+            order = np.argsort(self.posted_at, kind="stable")
+            for column in ("posted_at", "quality", "difficulty", "would_take_again", "grade"):
+                setattr(self, column, getattr(self, column)[order])
+            position = np.empty_like(order)
+            position[order] = np.arange(len(order))
+            self.tag_rows = position[self.tag_rows].astype(np.int32)
+
+class ReviewStats:
+    """
+    Per-professor review analytics. Every review the bot sees is parsed once into columnar
+    arrays (persisted in SQLite), and each update recomputes that professor's aggregates so
+    /sanrrstats only formats a precomputed summary. Other processes' writes are picked up
+    through a version counter that only this store's writes bump: each write tags its rows
+    with the new version, so refresh() reads and merges just the rows it hasn't seen.
+    Reviews with no known date are stored with posted_at 0 and left out of the time-based
+    aggregates.
+    """
+
+    def __init__(self, path):
+        self.grades = Vocabulary()
+        self.tags = Vocabulary()
+        self._professors = {} # professor_id -> ProfessorColumns
+        self._backfilled = set()
+        self._pending = []
+        self._lock = threading.Lock()
+        self._conn = open_db(path)
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+        self._version = -1 # Nothing loaded yet; the first refresh() reads every row
+
+    async def refresh(self):
+        """Merges rows written (by any process) since the last refresh; cheap when nothing changed."""
+        changes = await asyncio.to_thread(self._read_changes)
+        if changes is None:
+            return
+        version, backfilled, grouped = changes
+        for professor_id, reviews in grouped.items():
+            self._ingest(professor_id, reviews)
+        self._backfilled |= backfilled
+        self._version = max(self._version, version)
+
+    def _read_changes(self):
+        with self._lock:
+            version = self._conn.execute("SELECT version FROM review_stats_version").fetchone()[0]
+            if version == self._version:
+                return None
+            rows = self._conn.execute(
+                "SELECT professor_id, review_id, posted_at, quality, difficulty, would_take_again, grade, tags "
+                "FROM review_stats WHERE seq > ? AND seq <= ? ORDER BY professor_id, posted_at",
+                (self._version, version)
+            ).fetchall()
+            backfilled = {row[0] for row in self._conn.execute("SELECT professor_id FROM review_stats_backfills")}
+
+        grouped = {}
+        for row in rows:
+            grouped.setdefault(row["professor_id"], []).append(Review(
+                row["review_id"], posted_at=row["posted_at"], quality=row["quality"], difficulty=row["difficulty"],
+                would_take_again=row["would_take_again"], grade=row["grade"], tags=parse_tags(row["tags"]),
+            ))
+        return version, backfilled, grouped
+
+    def _bump_version(self):
+        """Called inside a write transaction; returns the version the write's rows belong to."""
+        self._conn.execute("UPDATE review_stats_version SET version = version + 1")
+        version = self._conn.execute("SELECT version FROM review_stats_version").fetchone()[0]
+        if self._version == version - 1:
+            # Nobody else wrote since our last refresh, and our own rows are already in memory
+            self._version = version
+        return version
+
+    def _ingest(self, professor_id, reviews):
+        """Appends unseen reviews to the professor's columns; returns the rows to persist."""
+        columns = self._professors.setdefault(professor_id, ProfessorColumns())
+        rows, tags, stored = [], [], []
+        for review in reviews:
+            if review.id in columns.review_ids:
+                continue
+            columns.review_ids.add(review.id)
+
+            posted_at = review.posted_at or 0 # 0: date unknown
+            quality, difficulty = review.quality, review.difficulty
+            would_take_again = review.would_take_again
+            grade = review.grade or None
+
+            offset = len(rows)
+            rows.append((
+                posted_at,
+                np.nan if quality is None else quality,
+                np.nan if difficulty is None else difficulty,
+                would_take_again if would_take_again in (0, 1) else -1,
+                -1 if grade is None else self.grades.code(grade),
+            ))
+            tags.extend((self.tags.code(tag), offset) for tag in review.tags)
+            stored.append((professor_id, review.id, posted_at, quality, difficulty,
+                           would_take_again, grade, "--".join(review.tags)))
+
+        if rows:
+            columns.append(rows, tags)
+            columns.summary = self._summarize(columns)
+        return stored
+
+    def _summarize(self, columns):
+        quality, difficulty = columns.quality, columns.difficulty
+        known_quality = ~np.isnan(quality)
+        known_difficulty = ~np.isnan(difficulty)
+        answered = columns.would_take_again >= 0
+
+        def mean(values, mask):
+            return float(values[mask].mean()) if mask.any() else None
+
+        recent = []
+        for n in RECENT_COUNTS:
+            if len(columns) > n:
+                window = slice(len(columns) - n, None)
+                recent.append((f"最近 {n} 条", n, mean(quality[window], known_quality[window]),
+                               mean(difficulty[window], known_difficulty[window])))
+
+        # Yearly averages for the trend line, over dated reviews only
+        dated = columns.posted_at > 0
+        years = columns.posted_at.astype("datetime64[s]").astype("datetime64[Y]").astype(np.int64) + 1970
+        trend = []
+        for year in np.unique(years[dated])[-TREND_YEARS:]:
+            in_year = dated & (years == year)
+            trend.append((int(year), int(in_year.sum()), mean(quality, in_year & known_quality)))
+
+        tag_counts = np.bincount(columns.tag_codes, minlength=len(self.tags.names))
+        top_tags = [(self.tags.names[code], int(tag_counts[code]))
+                    for code in np.argsort(-tag_counts, kind="stable")[:TOP_TAGS] if tag_counts[code]]
+
+        graded = columns.grade[columns.grade >= 0]
+        grade_counts = np.bincount(graded, minlength=len(self.grades.names))
+        grades = sorted((self.grades.names[code], int(count)) for code, count in enumerate(grade_counts) if count)
+
+        # Difficulty ratings are 1-5; bucket 0 catches anything unrated or out of range
+        difficulty_histogram = np.bincount(
+            np.clip(np.nan_to_num(difficulty).round().astype(np.int64), 0, 5), minlength=6
+        )[1:]
+
+        return {
+            "count": len(columns),
+            "quality": mean(quality, known_quality),
+            "difficulty": mean(difficulty, known_difficulty),
+            "would_take_again": float(columns.would_take_again[answered].mean() * 100) if answered.any() else None,
+            "recent": recent,
+            "trend": trend,
+            "tags": top_tags,
+            "grades": grades,
+            "difficulty_histogram": [int(count) for count in difficulty_histogram],
+            "latest": int(columns.posted_at[-1]) if dated.any() else None,
+            # Prefix sums so "last N days" windows are two searchsorted calls at query time;
+            # undated reviews sort first as 0, so they never fall inside a window
+            "_quality_sum": np.concatenate([[0], np.cumsum(np.nan_to_num(quality), dtype=np.float64)]),
+            "_quality_n": np.concatenate([[0], np.cumsum(known_quality)]),
+            "_difficulty_sum": np.concatenate([[0], np.cumsum(np.nan_to_num(difficulty), dtype=np.float64)]),
+            "_difficulty_n": np.concatenate([[0], np.cumsum(known_difficulty)]),
+            "_posted_at": columns.posted_at,
+        }
+
+    def add(self, professor_id, reviews):
+        """Folds newly seen reviews into the professor's columns and aggregates; persisted by save()."""
+        self._pending.extend(self._ingest(professor_id, reviews))
+
+    async def save(self):
+        if self._pending:
+            await asyncio.to_thread(self._write)
+
+    def _write(self):
+        rows, self._pending = self._pending, []
+        with self._lock, self._conn:
+            seq = self._bump_version()
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO review_stats (professor_id, review_id, posted_at, quality, difficulty, "
+                "would_take_again, grade, tags, seq) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [row + (seq,) for row in rows]
+            )
+
+    def count(self, professor_id):
+        columns = self._professors.get(professor_id)
+        return len(columns) if columns else 0
+
+    def needs_backfill(self, professor_id):
+        return professor_id not in self._backfilled
+
+    async def mark_backfilled(self, professor_id):
+        self._backfilled.add(professor_id)
+        await asyncio.to_thread(self._mark_backfilled, professor_id)
+
+    def _mark_backfilled(self, professor_id):
+        with self._lock, self._conn:
+            self._bump_version()
+            self._conn.execute("INSERT OR IGNORE INTO review_stats_backfills (professor_id) VALUES (?)", (professor_id,))
+
+    def summary(self, professor_id, now=None):
+        """
+        The professor's precomputed aggregates plus "last N days" windows, or None if nothing
+        is stored. Call refresh() first to pick up other processes' writes.
+        """
+        columns = self._professors.get(professor_id)
+        if not columns or columns.summary is None:
+            return None
+        summary = columns.summary
+        now = time.time() if now is None else now
+
+        windows = list(summary["recent"])
+        for days in RECENT_DAYS:
+            start = int(np.searchsorted(summary["_posted_at"], now - days * DAY))
+            n = summary["count"] - start
+            quality_n = summary["_quality_n"][-1] - summary["_quality_n"][start]
+            difficulty_n = summary["_difficulty_n"][-1] - summary["_difficulty_n"][start]
+            windows.append((
+                f"近 {days} 天", n,
+                float((summary["_quality_sum"][-1] - summary["_quality_sum"][start]) / quality_n) if quality_n else None,
+                float((summary["_difficulty_sum"][-1] - summary["_difficulty_sum"][start]) / difficulty_n) if difficulty_n else None,
+            ))
+
+        result = {key: value for key, value in summary.items() if not key.startswith("_")}
+        result["recent"] = windows
+        return result
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
-import requests
+import aiohttp
+import asyncio
 import json
 import base64
 import logging
-from datetime import datetime
+import random
+import time
+from collections import OrderedDict
+import metrics
+from review_model import Review
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -17,6 +22,22 @@ HEADERS = {
 
 GRAPHQL_URL = "https://www.ratemyprofessors.com/graphql"
 
+REQUEST_SECONDS = metrics.histogram("rmp_graphql_request_seconds", "RMP GraphQL round-trip time")
+REQUEST_ERRORS = metrics.counter("rmp_graphql_errors_total", "RMP GraphQL requests that failed at the HTTP level")
+REQUEST_RETRIES = metrics.counter("rmp_graphql_retries_total", "RMP GraphQL requests retried after a transient failure")
+CIRCUIT_OPEN = metrics.gauge("rmp_circuit_open", "1 while the RMP circuit breaker is rejecting requests")
+
+# Cache lifetimes (seconds). Names/stats barely change; reviews and poll batches go stale fast,
+# so those TTLs mostly exist to collapse bursts of identical commands into one request.
+DETAILS_TTL = 6 * 60 * 60
+REVIEWS_TTL = 60
+BATCH_TTL = 15
+# How long past its TTL a command may still be served a cached result while it refreshes
+STALE_TTL = 24 * 60 * 60
+
+# Fields the RMP schema has been seen to reject; once rejected they're left out of every query
+OPTIONAL_FIELDS = ("textbookUse",)
+
 PROFESSOR_QUERY = """
 query RatingsListQuery($id: ID!) {
   node(id: $id) {
@@ -38,10 +59,10 @@ query RatingsListQuery($id: ID!) {
 """
 
 RATINGS_QUERY = """
-query RatingsListQuery($count: Int!, $id: ID!, $courseFilter: String) {
+query RatingsListQuery($count: Int!, $id: ID!, $courseFilter: String, $cursor: String) {
   node(id: $id) {
     ... on Teacher {
-      ratings(first: $count, courseFilter: $courseFilter) {
+      ratings(first: $count, after: $cursor, courseFilter: $courseFilter) {
         edges {
           node {
             id
@@ -61,6 +82,10 @@ query RatingsListQuery($count: Int!, $id: ID!, $courseFilter: String) {
             textbookUse
           }
         }
+        pageInfo {
+          hasNextPage
+          endCursor
+        }
       }
     }
   }
@@ -74,80 +99,494 @@ query RatingsListQuery($count: Int!, $id: ID!, $courseFilter: String) {
 # Based on some online sources, 'textbookUse' might be the field name (int 0-5 or similar?).
 # But wait, looking at other scrapers, 'textbookUse' exists.
 
+# Watcher batches alias one node per professor (p0..pN) over these fragments.
+# The probe carries numRatings but no review bodies, so an idle poll stays tiny.
+PROBE_FRAGMENT = """
+fragment TeacherProbeFields on Teacher {
+  firstName
+  lastName
+  department
+  avgRating
+  avgDifficulty
+  numRatings
+  wouldTakeAgainPercent
+  school {
+    name
+    id
+  }
+}
+"""
+
+RATING_FRAGMENT = """
+fragment RatingFields on Rating {
+  id
+  comment
+  date
+  class
+  helpfulRating
+  difficultyRating
+  attendanceMandatory
+  wouldTakeAgain
+  grade
+  isForOnlineClass
+  isForCredit
+  ratingTags
+  thumbsUpTotal
+  thumbsDownTotal
+  textbookUse
+}
+"""
+
+def teacher_b64_id(professor_id):
+    # The ID needs to be base64 encoded "Teacher-<ID>"
+    return base64.b64encode(f"Teacher-{professor_id}".encode('ascii')).decode('ascii')
+
+def build_probe_query(size):
+    """Details for `size` teachers, aliased p0..pN with variables $id0..$idN."""
+    params = ", ".join(f"$id{i}: ID!" for i in range(size))
+    nodes = "\n".join(f"  p{i}: node(id: $id{i}) {{ ...TeacherProbeFields }}" for i in range(size))
+    return f"query WatchProbeQuery({params}) {{\n{nodes}\n}}\n" + PROBE_FRAGMENT
+
+def build_page_query(size):
+    """One page of ratings for `size` teachers, each resuming from its own $cursorN."""
+    params = ", ".join(f"$id{i}: ID!, $cursor{i}: String" for i in range(size))
+    nodes = "\n".join(
+        f"  p{i}: node(id: $id{i}) {{ ... on Teacher {{ ratings(first: $count, after: $cursor{i}) "
+        f"{{ edges {{ node {{ ...RatingFields }} }} pageInfo {{ hasNextPage endCursor }} }} }} }}"
+        for i in range(size)
+    )
+    return f"query WatchPageQuery($count: Int!, {params}) {{\n{nodes}\n}}\n" + RATING_FRAGMENT
+
+class TTLCache:
+    """
+    TTL + LRU cache for GraphQL results. Concurrent misses on the same key share
+    one in-flight load instead of each hitting the network. Entries stored with a
+    stale_ttl outlive their TTL by that much and are served stale while they refresh.
+    """
+
+    def __init__(self, maxsize=256, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict() # key -> (expires_at, stale_until, value), least recently used first
+        self._inflight = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _entry(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def get(self, key, stale=False):
+        """The fresh value, or with stale=True one past its TTL but inside its stale window; else None."""
+        entry = self._entry(key)
+        if entry is None or (not stale and entry[0] < time.monotonic()):
+            return None
+        return entry[2]
+
+    def set(self, key, value, ttl=None, stale_ttl=0):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, expires_at + stale_ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    async def get_or_load(self, key, loader, ttl=None, stale_ttl=0):
+        """
+        Returns the cached value or awaits `loader()`; None results and exceptions are not cached.
+        A stale value is returned at once while a background load refreshes it.
+        """
+        entry = self._entry(key)
+        if entry is not None:
+            if entry[0] >= time.monotonic():
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self._load(key, loader, ttl, stale_ttl).add_done_callback(self._log_refresh_failure)
+            return entry[2]
+
+        if key in self._inflight:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        # Shielded so one cancelled caller doesn't cancel the load for everyone else
+        return await asyncio.shield(self._load(key, loader, ttl, stale_ttl))
+
+    def _load(self, key, loader, ttl, stale_ttl):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t, ttl, stale_ttl))
+        return task
+
+    def _finish(self, key, task, ttl, stale_ttl):
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is None and task.result() is not None:
+            self.set(key, task.result(), ttl, stale_ttl)
+
+    @staticmethod
+    def _log_refresh_failure(task):
+        # Nobody awaits a background refresh, so its failure would otherwise go unseen
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Background refresh failed, still serving the cached result: {task.exception()}")
+
+    def stats(self):
+        return {"hits": self.hits, "stale_hits": self.stale_hits, "misses": self.misses,
+                "coalesced": self.coalesced, "size": len(self._data)}
+
+class RMPUnavailable(RuntimeError):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+def is_retryable(error):
+    """Timeouts, dropped connections, 5xx and 429 are worth another attempt; other HTTP errors are not."""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientError, OSError))
+
+class CircuitBreaker:
+    """
+    Stops calling RMP after `failure_threshold` consecutive transient failures. After
+    `reset_timeout` seconds one trial request is let through: success closes the circuit,
+    failure keeps it open for another `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self._trial or time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        if self.opened_at is None:
+            return True
+        if self._trial or time.monotonic() - self.opened_at < self.reset_timeout:
+            return False
+        self._trial = True
+        return True
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info("RMP is responding again; circuit closed.")
+            CIRCUIT_OPEN.set(0)
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_abandoned(self):
+        # The request ended without an answer either way (e.g. cancelled); let the next one be the trial
+        self._trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial or (self.opened_at is None and self.failures >= self.failure_threshold):
+            if self.opened_at is None:
+                logger.error(f"RMP failed {self.failures} times in a row; pausing requests for {self.reset_timeout}s.")
+            self.opened_at = time.monotonic()
+            self._trial = False
+            CIRCUIT_OPEN.set(1)
+
+class RMPClient:
+    """
+    Shared GraphQL transport: one keep-alive connection pool for every helper. Transient
+    failures are retried with jittered backoff, and a circuit breaker fails requests fast
+    while RMP keeps failing.
+    """
+
+    def __init__(self, url=GRAPHQL_URL, timeout=15, connect_timeout=5, max_concurrency=4, pool_size=8, cache_size=256,
+                 max_retries=2, base_delay=0.5, failure_threshold=5, reset_timeout=30):
+        self.url = url
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+        # Schema fields this process has seen RMP reject (see OPTIONAL_FIELDS)
+        self.rejected_fields = set()
+        # Shared by every helper and the watcher, so the poller and commands reuse each other's results
+        self.cache = TTLCache(maxsize=cache_size)
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.pool_size = pool_size
+        # Caps in-flight requests so a burst of commands can't hammer RMP
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session = None
+
+    def _get_session(self):
+        # Created lazily so it binds to the running event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, headers=HEADERS, timeout=self.timeout)
+        return self._session
+
+    async def graphql(self, query, variables):
+        """
+        Runs a query and returns the response JSON, GraphQL errors included. An optional
+        field RMP rejects is remembered and stripped from this and every later query.
+        """
+        for field in self.rejected_fields:
+            query = query.replace(field, "")
+        data = await self.post({"query": query, "variables": variables})
+
+        errors = str(data.get("errors") or "")
+        rejected = [field for field in OPTIONAL_FIELDS if field in errors and field not in self.rejected_fields]
+        if rejected:
+            logger.warning(f"RMP rejected {', '.join(rejected)}; leaving it out of queries from now on.")
+            self.rejected_fields.update(rejected)
+            return await self.graphql(query, variables)
+        return data
+
+    async def post(self, payload):
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise RMPUnavailable("RMP circuit breaker is open")
+            try:
+                data = await self._post_once(payload)
+            except Exception as e:
+                if not is_retryable(e):
+                    # RMP answered; the request itself was bad
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt == self.max_retries or self.breaker.state != "closed":
+                    raise
+                REQUEST_RETRIES.inc()
+                await asyncio.sleep(self.base_delay * 2 ** attempt * random.uniform(0.5, 1.5))
+            except BaseException:
+                # CancelledError skips the handler above; a cancelled trial must not wedge the breaker half-open
+                self.breaker.record_abandoned()
+                raise
+            else:
+                self.breaker.record_success()
+                return data
+
+    async def _post_once(self, payload):
+        session = self._get_session()
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                async with session.post(self.url, json=payload) as response:
+                    response.raise_for_status()
+                    return await response.json(content_type=None)
+            except Exception:
+                REQUEST_ERRORS.inc()
+                raise
+            finally:
+                REQUEST_SECONDS.observe(time.perf_counter() - started)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
 class RMPHelper:
-    def __init__(self, professor_id):
+    def __init__(self, professor_id, client=None):
         self.professor_id = str(professor_id)
-        # The ID needs to be base64 encoded "Teacher-<ID>"
-        self.b64_id = base64.b64encode(f"Teacher-{self.professor_id}".encode('ascii')).decode('ascii')
+        self.b64_id = teacher_b64_id(self.professor_id)
+        self.client = client or RMPClient()
 
-    def get_professor_details(self):
-        payload = {
-            "query": PROFESSOR_QUERY,
-            "variables": {"id": self.b64_id}
-        }
+    async def get_professor_details(self):
         try:
-            response = requests.post(GRAPHQL_URL, json=payload, headers=HEADERS)
-            response.raise_for_status()
-            data = response.json()
-            if data.get("errors"):
-                logger.error(f"GraphQL Errors: {data['errors']}")
-                return None
-            return data["data"]["node"]
+            return await self.client.cache.get_or_load(
+                ("details", self.professor_id), self._fetch_professor_details, ttl=DETAILS_TTL, stale_ttl=STALE_TTL
+            )
         except Exception as e:
             logger.error(f"Error fetching professor details: {e}")
             return None
 
-    def get_reviews(self, count=10):
-        # First try with textbookUse, if it fails, fallback without it
-        query_with_textbook = RATINGS_QUERY
-
-        payload = {
-            "query": query_with_textbook,
-            "variables": {
-                "id": self.b64_id,
-                "count": count,
-                "courseFilter": None
-            }
-        }
+    async def _fetch_professor_details(self):
+        data = await self.client.graphql(PROFESSOR_QUERY, {"id": self.b64_id})
+        if data.get("errors"):
+            raise RuntimeError(f"GraphQL Errors: {data['errors']}")
+        return data["data"]["node"]
 
+    async def get_reviews(self, count=10):
+        reviews, _ = await self.get_reviews_page(count=count)
+        return reviews
+
+    async def get_reviews_page(self, count=10, cursor=None, cached=True):
+        """
+        One page of reviews (newest first) plus the cursor for the next page, or None at the end.
+        cached=False always asks RMP and leaves the shared cache alone, for bulk or
+        must-be-current reads (history backfills, catch-up after downtime).
+        """
         try:
-            response = requests.post(GRAPHQL_URL, json=payload, headers=HEADERS)
-            response.raise_for_status()
-            data = response.json()
-
-            if data.get("errors"):
-                # Check if error is about textbookUse field
-                errors = str(data['errors'])
-                if "textbookUse" in errors:
-                    logger.warning("textbookUse field not found, retrying without it.")
-                    # Remove textbookUse from query
-                    query_safe = RATINGS_QUERY.replace("textbookUse", "")
-                    payload["query"] = query_safe
-                    response = requests.post(GRAPHQL_URL, json=payload, headers=HEADERS)
-                    response.raise_for_status()
-                    data = response.json()
-                else:
-                    logger.error(f"GraphQL Errors: {data['errors']}")
-                    return []
+            if not cached:
+                return await self._fetch_reviews_page(count, cursor)
+            reviews, next_cursor = await self.client.cache.get_or_load(
+                ("reviews", self.professor_id, count, cursor),
+                lambda: self._fetch_reviews_page(count, cursor),
+                ttl=REVIEWS_TTL, stale_ttl=STALE_TTL
+            )
+            # Copy so callers can reorder without touching the cached page
+            return list(reviews), next_cursor
+        except Exception as e:
+            logger.error(f"Error fetching reviews: {e}")
+            return [], None
+
+    async def _fetch_reviews_page(self, count, cursor):
+        # textbookUse is dropped by the client once RMP has rejected it
+        data = await self.client.graphql(RATINGS_QUERY, {
+            "id": self.b64_id,
+            "count": count,
+            "courseFilter": None,
+            "cursor": cursor
+        })
+
+        if data.get("errors"):
+            raise RuntimeError(f"GraphQL Errors: {data['errors']}")
+
+        if not data.get("data") or not data["data"].get("node"):
+            return [], None
+
+        ratings = data["data"]["node"]["ratings"]
+        reviews = [Review.from_node(edge["node"]) for edge in ratings["edges"]]
+        page_info = ratings.get("pageInfo") or {}
+        next_cursor = page_info.get("endCursor") if page_info.get("hasNextPage") else None
+        return reviews, next_cursor
+
+    async def get_reviews_until(self, stop, page_size=10, max_pages=5, cached=True):
+        """Newest-first reviews, paging only until `stop(review)` is true for one of them."""
+        reviews = []
+        cursor = None
+        for _ in range(max_pages):
+            page, cursor = await self.get_reviews_page(count=page_size, cursor=cursor, cached=cached)
+            for review in page:
+                if stop(review):
+                    return reviews
+                reviews.append(review)
+            if not cursor:
+                break
+        return reviews
 
-            if not data.get("data") or not data["data"].get("node"):
-                return []
+class RMPWatcher:
+    """Polls many professors at once: one aliased GraphQL query per chunk of professors."""
 
-            edges = data["data"]["node"]["ratings"]["edges"]
-            reviews = [edge["node"] for edge in edges]
-            return reviews
+    def __init__(self, client=None, chunk_size=10):
+        self.client = client or RMPClient()
+        self.chunk_size = chunk_size
 
+    def _chunks(self, professor_ids):
+        ids = list(dict.fromkeys(professor_ids))
+        return [ids[i:i + self.chunk_size] for i in range(0, len(ids), self.chunk_size)]
+
+    async def _query(self, query, variables, chunk):
+        """Runs one batch; returns the aliased nodes, or None if the whole batch failed."""
+        key = ("batch", query, json.dumps(variables, sort_keys=True))
+        try:
+            return await self.client.cache.get_or_load(key, lambda: self._post_batch(query, variables), ttl=BATCH_TTL)
         except Exception as e:
-            logger.error(f"Error fetching reviews: {e}")
-            return []
+            logger.error(f"Error fetching professor batch {chunk}: {e}")
+            return None
 
-if __name__ == "__main__":
+    async def _post_batch(self, query, variables):
+        data = await self.client.graphql(query, variables)
+
+        if data.get("errors"):
+            if not data.get("data"):
+                raise RuntimeError(f"GraphQL Errors: {data['errors']}")
+            else:
+                # Partial success: keep whichever teachers resolved
+                logger.warning(f"GraphQL Errors (partial batch): {data['errors']}")
+
+        return data.get("data") or {}
+
+    async def probe(self, professor_ids):
+        """Cheap pass returning {professor_id: details}; details include numRatings."""
+        chunks = self._chunks(professor_ids)
+        batches = await asyncio.gather(*(
+            self._query(build_probe_query(len(chunk)),
+                        {f"id{i}": teacher_b64_id(pid) for i, pid in enumerate(chunk)}, chunk)
+            for chunk in chunks
+        ))
+
+        results = {}
+        for chunk, nodes in zip(chunks, batches):
+            for i, professor_id in enumerate(chunk):
+                node = (nodes or {}).get(f"p{i}")
+                if node:
+                    results[professor_id] = node
+                    # Keeps name lookups (get_professor_details) off the network
+                    self.client.cache.set(("details", str(professor_id)), node, ttl=DETAILS_TTL, stale_ttl=STALE_TTL)
+                elif nodes is not None:
+                    logger.warning(f"Professor {professor_id} not found on RMP.")
+        return results
+
+    async def fetch_new_reviews(self, professor_ids, known_ids, page_size=5, max_pages=4):
+        """
+        Returns {professor_id: [new reviews, newest first]}, paging each professor only
+        until a review ID in `known_ids[professor_id]` shows up. Professors whose fetch failed are left
+        out so callers can retry them next poll.
+        """
+        cursors = {pid: None for pid in dict.fromkeys(professor_ids)}
+        results = {pid: [] for pid in cursors}
+
+        for _ in range(max_pages):
+            if not cursors:
+                break
+            chunks = self._chunks(cursors)
+            batches = await asyncio.gather(*(
+                self._query(build_page_query(len(chunk)), self._page_variables(chunk, cursors, page_size), chunk)
+                for chunk in chunks
+            ))
+
+            next_cursors = {}
+            for chunk, nodes in zip(chunks, batches):
+                for i, professor_id in enumerate(chunk):
+                    node = (nodes or {}).get(f"p{i}")
+                    if not node:
+                        results.pop(professor_id, None)
+                        continue
+
+                    ratings = node["ratings"]
+                    reached_known = False
+                    for edge in ratings["edges"]:
+                        if edge["node"]["id"] in known_ids.get(professor_id, ()):
+                            reached_known = True
+                            break
+                        results[professor_id].append(Review.from_node(edge["node"]))
+
+                    page_info = ratings.get("pageInfo") or {}
+                    if not reached_known and page_info.get("hasNextPage"):
+                        next_cursors[professor_id] = page_info.get("endCursor")
+            cursors = next_cursors
+
+        return results
+
+    def _page_variables(self, chunk, cursors, page_size):
+        variables = {"count": page_size}
+        for i, professor_id in enumerate(chunk):
+            variables[f"id{i}"] = teacher_b64_id(professor_id)
+            variables[f"cursor{i}"] = cursors[professor_id]
+        return variables
+
+async def _main():
     # Test with Pengyuan Liu
     rmp = RMPHelper(2635703)
-    print("Fetching Professor Details...")
-    details = rmp.get_professor_details()
-    print(json.dumps(details, indent=2))
+    try:
+        print("Fetching Professor Details...")
+        details = await rmp.get_professor_details()
+        print(json.dumps(details, indent=2))
 
-    print("\nFetching Reviews...")
-    reviews = rmp.get_reviews(count=5)
-    print(json.dumps(reviews, indent=2))
+        print("\nFetching Reviews...")
+        reviews = await rmp.get_reviews(count=5)
+        print(json.dumps([{field: getattr(r, field) for field in Review.__slots__} for r in reviews], indent=2))
+    finally:
+        await rmp.client.close()
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+import asyncio
+import threading
+from storage import open_db
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_reviews (
+    professor_id TEXT NOT NULL,
+    review_id TEXT NOT NULL,
+    UNIQUE (professor_id, review_id)
+)
+"""
+
+class SeenStore:
+    """
+    Review IDs the poller has already handled, scoped per professor. Each professor's IDs
+    live in an insertion-ordered dict, so membership is O(1) and eviction drops the oldest
+    once a professor exceeds `max_per_professor`. Changes are persisted by save().
+    """
+
+    def __init__(self, path, max_per_professor=20000):
+        self.max_per_professor = max_per_professor
+        self._seen = {} # str(professor_id) -> {review_id: None}
+        self._added = []
+        self._evicted = []
+        self._lock = threading.Lock()
+        self._conn = open_db(path)
+        with self._conn:
+            self._conn.execute(SCHEMA)
+        self.reload()
+
+    def reload(self):
+        """Re-reads the table, e.g. after another process has been the one polling."""
+        seen = {}
+        with self._lock:
+            for professor_id, review_id in self._conn.execute(
+                "SELECT professor_id, review_id FROM seen_reviews ORDER BY rowid"
+            ):
+                seen.setdefault(professor_id, {})[review_id] = None
+        self._seen = seen
+
+    def view(self, professor_id):
+        """Read-only membership view (supports `in`) of one professor's seen IDs."""
+        return self._seen.get(str(professor_id), {}).keys()
+
+    def is_seen(self, professor_id, review_id):
+        return review_id in self._seen.get(str(professor_id), ())
+
+    def add(self, professor_id, review_id):
+        key = str(professor_id)
+        seen = self._seen.setdefault(key, {})
+        if review_id in seen:
+            return
+        seen[review_id] = None
+        self._added.append((key, review_id))
+        while len(seen) > self.max_per_professor:
+            oldest = next(iter(seen))
+            del seen[oldest]
+            self._evicted.append((key, oldest))
+
+    def import_legacy(self, professor_id, review_ids):
+        """Seeds a professor from the old global seen_reviews list in config.json (startup only)."""
+        for review_id in review_ids:
+            self.add(professor_id, review_id)
+        self._write()
+
+    async def save(self):
+        if self._added or self._evicted:
+            await asyncio.to_thread(self._write)
+
+    def _write(self):
+        added, self._added = self._added, []
+        evicted, self._evicted = self._evicted, []
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen_reviews (professor_id, review_id) VALUES (?, ?)", added
+            )
+            self._conn.executemany(
+                "DELETE FROM seen_reviews WHERE professor_id = ? AND review_id = ?", evicted
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+import sqlite3
+
+def open_db(path):
+    """Opens a SQLite connection for the bot's local stores (WAL, so readers never block the writer)."""
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
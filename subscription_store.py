@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+import asyncio
+import threading
+from storage import open_db
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscriptions (
+    channel_id INTEGER NOT NULL,
+    professor_id INTEGER NOT NULL,
+    PRIMARY KEY (channel_id, professor_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rmp_high_water (
+    professor_id INTEGER PRIMARY KEY,
+    num_ratings INTEGER
+);
+"""
+
+class SubscriptionStore:
+    """
+    Channel -> professor subscriptions and per-professor numRatings high-water marks,
+    shared by every bot process through SQLite. Reads are served from an in-memory
+    snapshot that is reloaded whenever another connection commits (PRAGMA data_version).
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = open_db(path)
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+        self._data_version = None
+        self._subscriptions = {} # channel_id -> [professor_id, ...]
+        self._high_water = {} # professor_id -> numRatings
+        self._refresh()
+
+    def _refresh(self):
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._data_version:
+                return
+            self._load()
+            self._data_version = version
+
+    def _load(self):
+        subscriptions = {}
+        for channel_id, professor_id in self._conn.execute(
+            "SELECT channel_id, professor_id FROM subscriptions ORDER BY channel_id, professor_id"
+        ):
+            subscriptions.setdefault(channel_id, []).append(professor_id)
+        self._subscriptions = subscriptions
+        self._high_water = dict(self._conn.execute("SELECT professor_id, num_ratings FROM rmp_high_water"))
+
+    def channel_ids(self):
+        self._refresh()
+        return list(self._subscriptions)
+
+    def professors(self, channel_id):
+        self._refresh()
+        return list(self._subscriptions.get(channel_id, []))
+
+    def watched(self):
+        """Maps each watched professor to the channels subscribed to it."""
+        self._refresh()
+        watchers = {}
+        for channel_id, professor_ids in self._subscriptions.items():
+            for professor_id in professor_ids:
+                watchers.setdefault(professor_id, []).append(channel_id)
+        return watchers
+
+    def high_water(self, professor_id):
+        self._refresh()
+        return self._high_water.get(professor_id)
+
+    async def add(self, channel_id, professor_id):
+        await asyncio.to_thread(self._execute, [(
+            "INSERT OR IGNORE INTO subscriptions (channel_id, professor_id) VALUES (?, ?)", [(channel_id, professor_id)]
+        )])
+
+    async def remove(self, channel_id, professor_id=None):
+        """Drops one professor from a channel, or the whole channel when professor_id is None."""
+        if professor_id is None:
+            statement = ("DELETE FROM subscriptions WHERE channel_id = ?", [(channel_id,)])
+        else:
+            statement = ("DELETE FROM subscriptions WHERE channel_id = ? AND professor_id = ?", [(channel_id, professor_id)])
+        await asyncio.to_thread(self._execute, [statement])
+
+    async def set_high_water(self, marks):
+        """marks: {professor_id: numRatings}; None clears a mark so the next poll fetches ratings."""
+        await asyncio.to_thread(self._execute, [(
+            "INSERT OR REPLACE INTO rmp_high_water (professor_id, num_ratings) VALUES (?, ?)", list(marks.items())
+        )])
+
+    def import_legacy(self, channel_ids, subscriptions, num_ratings, default_professor):
+        """One-time import of the state config.json used to hold (startup only)."""
+        rows = []
+        for channel_id in channel_ids:
+            for professor_id in subscriptions.get(str(channel_id)) or [default_professor]:
+                rows.append((channel_id, professor_id))
+        self._execute([
+            ("INSERT OR IGNORE INTO subscriptions (channel_id, professor_id) VALUES (?, ?)", rows),
+            ("INSERT OR REPLACE INTO rmp_high_water (professor_id, num_ratings) VALUES (?, ?)",
+             [(int(pid), n) for pid, n in num_ratings.items()]),
+        ])
+
+    def _execute(self, statements):
+        with self._lock:
+            with self._conn:
+                for sql, rows in statements:
+                    self._conn.executemany(sql, rows)
+            # Our own commits don't bump data_version, so reload the snapshot here
+            self._load()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
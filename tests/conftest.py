@@ -0,0 +1,22 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+@pytest.fixture(scope="session")
+def raalmbot(tmp_path_factory):
+    """bot.py imported inside a scratch directory, since it keeps its state in the working directory."""
+    workdir = tmp_path_factory.mktemp("raalmbot")
+    for name in ("responses.json", "fortunes.json"):
+        shutil.copy(os.path.join(REPO_DIR, name), workdir)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import bot
+        yield bot
+    finally:
+        os.chdir(cwd)
@@ -0,0 +1,40 @@
+import asyncio
+
+def test_botlog_pages_show_every_row_exactly_once(raalmbot, tmp_path):
+    store = raalmbot.LogStore(tmp_path / "logs.db", retention=1000)
+    store._write([{
+        "timestamp": f"2026-01-01T00:{n // 60:02d}:{n % 60:02d}", "content": f"RMP Review ID: {'x' * 40} {n}",
+        "channel": "general", "requester": "alice"
+    } for n in range(100)])
+    filters = {"requester": None, "channel": None, "since": None, "until": None}
+
+    async def walk():
+        seen = []
+        entries, has_older = await store.page(limit=raalmbot.LOG_PAGE_SIZE)
+        shown = raalmbot.fit_log_page(entries, filters)
+        pages = [shown]
+        has_older = has_older or len(shown) < len(entries)
+        while has_older:
+            entries, has_older = await store.page(limit=raalmbot.LOG_PAGE_SIZE, before_id=pages[-1][-1]["id"])
+            shown = raalmbot.fit_log_page(entries, filters)
+            has_older = has_older or len(shown) < len(entries)
+            pages.append(shown)
+        # ...and forward again from the oldest page
+        forward = [pages[-1]]
+        has_newer = True
+        while has_newer:
+            entries, has_newer = await store.page(limit=raalmbot.LOG_PAGE_SIZE, after_id=forward[-1][0]["id"])
+            if not entries:
+                break
+            shown = raalmbot.fit_log_page(entries, filters, keep_newest=False)
+            has_newer = has_newer or len(shown) < len(entries)
+            forward.append(shown)
+        return pages, forward
+
+    pages, forward = asyncio.run(walk())
+    assert all(len(raalmbot.format_log_page(page, filters)) <= 2000 for page in pages + forward)
+    backward_ids = [entry["id"] for page in pages for entry in page]
+    forward_ids = [entry["id"] for page in reversed(forward) for entry in page]
+    assert backward_ids == list(range(100, 0, -1))
+    assert sorted(forward_ids, reverse=True) == list(range(100, 0, -1))
+    assert len(pages[0]) < raalmbot.LOG_PAGE_SIZE # the rows really were too long for a full page
@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+from bench import FakeChannel, FakeInteraction, FakeRMP
+
+RMP_LATENCY = 0.2 # Seconds per stand-in GraphQL response
+CHANNELS = 20
+REVIEWS = 5
+
+def test_wsnd_latency_stays_flat_while_rmp_fetches_are_in_flight(raalmbot, monkeypatch):
+    async def no_backfills(details):
+        pass
+    monkeypatch.setattr(raalmbot, "schedule_history_backfills", no_backfills)
+    monkeypatch.setattr(raalmbot, "draw_limits", raalmbot.DrawLimits())
+
+    async def scenario():
+        fake = FakeRMP(REVIEWS, RMP_LATENCY, comment_size=500)
+        await fake.start()
+        try:
+            raalmbot.get_rmp_client().url = fake.url
+            channels = {cid: FakeChannel(cid, 0.01) for cid in range(1000, 1000 + CHANNELS)}
+            for channel_id in channels:
+                await raalmbot.subscription_store.add(channel_id, raalmbot.PROFESSOR_ID)
+            monkeypatch.setattr(raalmbot.bot, "get_channel", channels.get)
+
+            channel = FakeChannel(1, 0)
+            latencies = []
+            poll = asyncio.create_task(raalmbot.check_rmp_updates())
+            while not poll.done():
+                started = time.perf_counter()
+                await raalmbot.wsnd.callback(FakeInteraction(channel))
+                latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+            outcomes = await poll
+            return latencies, outcomes, sum(ch.sent for ch in channels.values())
+        finally:
+            await raalmbot.rmp_client.close()
+            await fake.stop()
+
+    latencies, outcomes, sent = asyncio.run(scenario())
+
+    # The probe and the ratings page are two sequential round trips, so the poll was in flight for
+    # at least 2 * RMP_LATENCY and /wsnd ran many times meanwhile without waiting on either
+    assert outcomes == {raalmbot.PROFESSOR_ID: "new"}
+    assert sent == CHANNELS * REVIEWS
+    assert len(latencies) >= 10
+    assert max(latencies) < RMP_LATENCY / 4
@@ -0,0 +1,69 @@
+import asyncio
+import json
+import time
+
+from config_store import CONFIG_VERSION, ConfigStore
+from draw_limits import DEFAULT_DRAW_LIMITS
+
+def test_load_migrates_old_layouts(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"version": 4, "legacy_rmp_state": {}}))
+    store = ConfigStore(str(path), defaults={})
+    assert store.load()["draw_limits"] == DEFAULT_DRAW_LIMITS
+    assert json.loads(path.read_text())["version"] == CONFIG_VERSION
+
+def test_save_during_a_write_is_not_lost(tmp_path):
+    path = tmp_path / "config.json"
+    store = ConfigStore(str(path), defaults={}, delay=0.01)
+    write = store._write
+    writing = []
+
+    def slow_write(snapshot):
+        writing.append(json.loads(snapshot)["a"])
+        time.sleep(0.1)
+        write(snapshot)
+    store._write = slow_write
+
+    async def scenario():
+        store.data["a"] = 1
+        store.save()
+        while not writing:
+            await asyncio.sleep(0.01)
+        store.data["a"] = 2
+        store.save()
+        await store._flush_task
+
+    asyncio.run(scenario())
+    assert json.loads(path.read_text())["a"] == 2
+
+def test_close_without_changes_leaves_the_file_alone(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text('{"version": 5, "command_tree_hash": "abc",}') # trailing-comma typo
+    store = ConfigStore(str(path), defaults={"draw_limits": DEFAULT_DRAW_LIMITS})
+    store.load()
+    asyncio.run(store.close())
+    assert path.read_text() == '{"version": 5, "command_tree_hash": "abc",}'
+
+    # Even an explicit change isn't written over a file that failed to load
+    async def change():
+        store.data["a"] = 1
+        store.save()
+        await store.close()
+    asyncio.run(change())
+    store.save_now()
+    assert path.read_text() == '{"version": 5, "command_tree_hash": "abc",}'
+
+def test_close_writes_pending_changes(tmp_path):
+    path = tmp_path / "config.json"
+    store = ConfigStore(str(path), defaults={}, delay=60)
+    store.load()
+
+    async def scenario():
+        await store.close()
+        assert not path.exists()
+        store.data["a"] = 1
+        store.save()
+        await store.close()
+
+    asyncio.run(scenario())
+    assert json.loads(path.read_text())["a"] == 1
@@ -0,0 +1,45 @@
+from convert_tool import convert
+from corpus import Corpus, CorpusWriter, build_corpus, iter_entries
+
+def test_corpus_round_trip_and_uncommitted_appends_are_dropped(tmp_path):
+    base = str(tmp_path / "pool")
+    writer = CorpusWriter(base)
+    for text in ("一", "two", "三三"):
+        writer.append(text)
+    writer.commit()
+    writer.append("never committed")
+    writer._blob.close() # Simulates a crash before commit()
+
+    corpus = Corpus(base)
+    assert len(corpus) == 3 and [corpus[i] for i in range(3)] == ["一", "two", "三三"]
+    corpus.close()
+
+    writer = CorpusWriter(base)
+    writer.append("four")
+    writer.close()
+    assert list(iter_entries(base)) == ["一", "two", "三三", "four"]
+
+def test_build_corpus_replaces_the_files(tmp_path):
+    base = str(tmp_path / "pool")
+    build_corpus(base, ["a", "b"])
+    assert build_corpus(base, ["c"]) == 1
+    assert list(iter_entries(base)) == ["c"]
+
+def test_convert_resumes_inside_an_entry_without_junk(tmp_path):
+    source = tmp_path / "source.txt"
+    base = str(tmp_path / "responses")
+    state = base + ".state"
+    source.write_text("1. aaa\nbbb 2. ccc\n", encoding="utf-8")
+    convert(str(source), base, state)
+    assert convert(str(source), base, state)[0] == 0
+    assert list(iter_entries(base)) == ["aaabbb", "ccc"]
+
+    # Still being written: "3. ddd" isn't known to be finished until the "4." line is complete
+    with open(source, "a", encoding="utf-8") as f:
+        f.write("3. ddd\n4. ee")
+    convert(str(source), base, state, final=False)
+    assert list(iter_entries(base)) == ["aaabbb", "ccc"]
+    with open(source, "a", encoding="utf-8") as f:
+        f.write("e\n")
+    convert(str(source), base, state)
+    assert list(iter_entries(base)) == ["aaabbb", "ccc", "ddd", "eee"]
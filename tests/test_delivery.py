@@ -0,0 +1,79 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+from delivery import DeliveryScheduler
+
+def http_error(cls, status):
+    return cls(SimpleNamespace(status=status, reason="stand-in"), "stand-in")
+
+class FakeChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+
+def test_transient_errors_are_retried_and_fatal_ones_stop_the_channel():
+    failures = {"flaky": [http_error(discord.HTTPException, 503), http_error(discord.HTTPException, 429)],
+                "bad-request": [http_error(discord.HTTPException, 400)],
+                "forbidden": [http_error(discord.Forbidden, 403)],
+                "gone": [http_error(discord.NotFound, 404)]}
+    sent = []
+
+    def job(label):
+        async def send():
+            if failures.get(label):
+                raise failures[label].pop(0)
+            sent.append(label)
+        return label, send
+
+    flaky, forbidden, gone = FakeChannel(1), FakeChannel(2), FakeChannel(3)
+    scheduler = DeliveryScheduler(max_retries=3, base_delay=0)
+    results = asyncio.run(scheduler.run({
+        flaky: [job("flaky"), job("bad-request"), job("after-bad-request")],
+        forbidden: [job("forbidden"), job("skipped-1")],
+        gone: [job("gone"), job("skipped-2")],
+    }))
+    by_label = {result["label"]: result for result in results}
+
+    assert by_label["flaky"]["ok"] and by_label["flaky"]["attempts"] == 3
+    # A 400 isn't retried, but it's the message that's bad, not the channel
+    assert not by_label["bad-request"]["ok"] and by_label["bad-request"]["attempts"] == 1
+    assert by_label["after-bad-request"]["ok"]
+    for label in ("forbidden", "gone"):
+        assert not by_label[label]["ok"] and by_label[label]["attempts"] == 1
+    for label in ("skipped-1", "skipped-2"):
+        assert not by_label[label]["ok"] and by_label[label]["attempts"] == 0
+    assert sorted(sent) == ["after-bad-request", "flaky"]
+
+def test_retries_give_up_after_max_retries():
+    async def send():
+        raise http_error(discord.HTTPException, 502)
+
+    results = asyncio.run(DeliveryScheduler(max_retries=2, base_delay=0).run({FakeChannel(1): [("review", send)]}))
+    assert results == [{"channel_id": 1, "label": "review", "ok": False, "attempts": 3, "latency": results[0]["latency"]}]
+
+def test_channels_run_in_parallel_and_each_channel_in_order():
+    events = []
+
+    def job(channel_id, n):
+        async def send():
+            events.append(("start", channel_id, n))
+            await asyncio.sleep(0.05)
+            events.append(("end", channel_id, n))
+        return f"{channel_id}-{n}", send
+
+    channels = [FakeChannel(channel_id) for channel_id in range(3)]
+
+    async def scenario():
+        started = asyncio.get_running_loop().time()
+        await DeliveryScheduler(max_concurrency=3, base_delay=0).run(
+            {channel: [job(channel.id, n) for n in range(3)] for channel in channels}
+        )
+        return asyncio.get_running_loop().time() - started
+
+    elapsed = asyncio.run(scenario())
+    for channel in channels:
+        mine = [(kind, n) for kind, channel_id, n in events if channel_id == channel.id]
+        assert mine == [("start", 0), ("end", 0), ("start", 1), ("end", 1), ("start", 2), ("end", 2)]
+    # Three channels of three 50 ms sends overlap: about 150 ms, not 450 ms
+    assert elapsed < 0.3
@@ -0,0 +1,27 @@
+from draw_limits import DrawLimits, RateLimiter
+
+def test_rate_limiter_refills_at_its_rate():
+    limiter = RateLimiter(burst=2, per_minute=60)
+    for _ in range(2):
+        assert limiter.wait_time("u", 0) == 0
+        limiter.take("u", 0)
+    assert limiter.wait_time("u", 0) == 1.0
+    assert limiter.wait_time("u", 0.5) == 0.5
+    assert limiter.wait_time("u", 1.0) == 0
+
+def test_draw_limits_take_from_both_buckets_only_when_both_allow():
+    limits = DrawLimits(user=RateLimiter(burst=5, per_minute=60), guild=RateLimiter(burst=1, per_minute=60))
+    assert limits.acquire("alice", "guild", now=0) == 0
+    # The guild is empty: bob waits, and his own bucket isn't charged for it
+    assert limits.acquire("bob", "guild", now=0) == 1.0
+    assert limits.user.wait_time("bob", 0) == 0 and limits.user._buckets["bob"][0] == 5
+    # DMs only count against the user
+    assert limits.acquire("bob", None, now=0) == 0
+
+def test_from_config_disables_buckets_and_keeps_recent_draws():
+    limits = DrawLimits.from_config({"guild": {"burst": 0}, "no_repeat": 2})
+    assert limits.guild is None and limits.user is not None
+    recent = limits.recent("wsnd", 1)
+    recent.extend([1, 2, 3])
+    assert list(limits.recent("wsnd", 1)) == [2, 3]
+    assert DrawLimits.from_config({}).recent("wsnd", 1) is None
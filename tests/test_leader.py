@@ -0,0 +1,46 @@
+import asyncio
+
+from leader import LeaderLease
+
+def test_only_one_process_holds_the_lease(tmp_path):
+    path = tmp_path / "shared.db"
+    a, b = LeaderLease(path, "poller", ttl=60), LeaderLease(path, "poller", ttl=60)
+    assert a._try_acquire()
+    assert not b._try_acquire()
+    # Renewing keeps it with the holder
+    assert a._try_acquire() and not b._try_acquire()
+    # Other lease names are independent
+    assert LeaderLease(path, "other")._try_acquire()
+
+def test_lease_passes_on_after_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("leader.time.time", lambda: now[0])
+    path = tmp_path / "shared.db"
+    a, b = LeaderLease(path, "poller", ttl=60), LeaderLease(path, "poller", ttl=60)
+    assert a._try_acquire()
+    now[0] += 59
+    assert not b._try_acquire()
+    now[0] += 2 # a stopped renewing
+    assert b._try_acquire()
+    assert not a._try_acquire()
+
+def test_release_lets_another_process_take_over_at_once(tmp_path):
+    path = tmp_path / "shared.db"
+    a, b = LeaderLease(path, "poller", ttl=60), LeaderLease(path, "poller", ttl=60)
+    a.is_leader = a._try_acquire()
+    assert not b._try_acquire()
+    asyncio.run(a.release())
+    assert not a.is_leader
+    assert b._try_acquire()
+
+def test_wakeups_are_delivered_once(tmp_path):
+    path = tmp_path / "shared.db"
+    leader, follower = LeaderLease(path, "poller"), LeaderLease(path, "poller")
+
+    async def scenario():
+        before = await leader.consume_wakeup()
+        await follower.request_wakeup()
+        await follower.request_wakeup() # requests coalesce
+        return before, await leader.consume_wakeup(), await leader.consume_wakeup()
+
+    assert asyncio.run(scenario()) == (False, True, False)
@@ -0,0 +1,25 @@
+import asyncio
+
+from log_store import LogStore
+
+def entry(n, requester="alice", channel="general"):
+    return {"timestamp": f"2026-01-01T00:00:{n:02d}", "content": f"message {n}",
+            "channel": channel, "requester": requester}
+
+def test_log_store_pages_with_filters_in_both_directions(tmp_path):
+    store = LogStore(tmp_path / "logs.db", retention=1000)
+    store._write([entry(n, requester="alice" if n % 2 else "bob") for n in range(10)])
+
+    async def scenario():
+        newest, more = await store.page(requester="alice", limit=2)
+        older, older_more = await store.page(requester="alice", before_id=newest[-1]["id"], limit=2)
+        newer, _ = await store.page(requester="alice", after_id=older[-1]["id"], limit=2)
+        window, _ = await store.page(since="2026-01-01T00:00:03", until="2026-01-01T00:00:06")
+        return newest, more, older, older_more, newer, window
+
+    newest, more, older, older_more, newer, window = asyncio.run(scenario())
+    assert [e["content"] for e in newest] == ["message 9", "message 7"] and more
+    assert [e["content"] for e in older] == ["message 5", "message 3"] and older_more
+    # Walking back towards newer entries still returns them newest first
+    assert [e["content"] for e in newer] == ["message 7", "message 5"]
+    assert [e["content"] for e in window] == ["message 5", "message 4", "message 3"]
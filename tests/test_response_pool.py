@@ -0,0 +1,38 @@
+import asyncio
+import json
+import os
+
+from convert_tool import convert
+from corpus import iter_entries
+from response_pool import ResponsePool
+
+def write_json(path, entries, mtime):
+    path.write_text(json.dumps(entries, ensure_ascii=False), encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+def test_pool_rebuilds_from_newer_json(tmp_path):
+    path = tmp_path / "responses.json"
+    write_json(path, ["a", "b"], mtime=1000)
+    pool = ResponsePool(str(path), "missing")
+    assert list(pool.items) == ["a", "b"]
+
+    write_json(path, ["a", "b", "c"], mtime=os.path.getmtime(pool.index_path) + 10)
+    assert asyncio.run(pool.reload_if_changed())
+    assert list(pool.items) == ["a", "b", "c"]
+    assert pool.choice() in ("a", "b", "c")
+
+def test_pool_never_rebuilds_a_corpus_convert_tool_owns(tmp_path):
+    source = tmp_path / "source.txt"
+    source.write_text("1. x\n2. y\n", encoding="utf-8")
+    base = str(tmp_path / "responses")
+    convert(str(source), base, base + ".state")
+
+    path = tmp_path / "responses.json"
+    write_json(path, ["stale"], mtime=os.path.getmtime(base + ".idx") + 10)
+    pool = ResponsePool(str(path), "missing")
+    assert list(pool.items) == ["x", "y"]
+    assert list(iter_entries(base)) == ["x", "y"]
+
+def test_missing_files_serve_the_missing_message(tmp_path):
+    pool = ResponsePool(str(tmp_path / "responses.json"), "missing")
+    assert pool.choice() == "missing"
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+import pytest
+
+from review_model import Review, parse_rmp_date, parse_tags
+
+def strptime_epoch(text):
+    return int(datetime.strptime(text.replace(" UTC", ""), "%Y-%m-%d %H:%M:%S %z").timestamp())
+
+@pytest.mark.parametrize("text", [
+    "2025-12-25 23:17:27 +0000 UTC",
+    "2024-02-29 00:00:00 +0000 UTC",
+    "2025-01-01 00:30:00 +0530 UTC",
+    "2025-01-01 23:59:59 -0800 UTC",
+    "1999-12-31 12:00:00 -0345 UTC",
+    "2025-06-15 08:00:00 +1400",
+])
+def test_fast_path_matches_strptime(text):
+    assert parse_rmp_date(text) == strptime_epoch(text)
+
+@pytest.mark.parametrize("text", [
+    "2025-02-30 10:00:00 +0000 UTC",
+    "2025-13-01 10:00:00 +0000 UTC",
+    "2025-01-01 24:00:00 +0000 UTC",
+    "not a date",
+    "",
+    None,
+])
+def test_unreadable_dates_are_none(text):
+    assert parse_rmp_date(text) is None
+
+def test_other_formats_fall_back_to_strptime():
+    assert parse_rmp_date("2025-1-2 03:04:05 +0000 UTC") == strptime_epoch("2025-01-02 03:04:05 +0000 UTC")
+
+def test_review_from_node():
+    review = Review.from_node({
+        "id": "r1", "date": "2025-12-25 23:17:27 +0000 UTC", "ratingTags": "Tough grader-- Caring --",
+        "helpfulRating": 4, "difficultyRating": 3,
+    })
+    assert review.posted_at == strptime_epoch("2025-12-25 23:17:27 +0000 UTC")
+    assert review.tags == parse_tags("Tough grader--Caring") == ("Tough grader", "Caring")
+    assert (review.quality, review.difficulty) == (4, 3)
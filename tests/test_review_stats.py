@@ -0,0 +1,45 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from review_model import Review
+from review_stats import ReviewStats
+
+YEAR_2024 = 1_704_067_200 # 2024-01-01 UTC
+
+def test_refresh_merges_other_writers_and_keeps_unsaved_reviews(tmp_path):
+    path = tmp_path / "stats.db"
+
+    async def scenario():
+        mine, other = ReviewStats(path), ReviewStats(path)
+        await mine.refresh()
+        await other.refresh()
+        mine.add(1, [Review("unsaved", posted_at=YEAR_2024, quality=5.0)])
+
+        other.add(1, [Review("theirs", posted_at=YEAR_2024 + 60, quality=3.0)])
+        await other.save()
+        # Commits from unrelated connections to the same database don't count as changes
+        conn = sqlite3.connect(path)
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS unrelated (x)")
+            conn.execute("INSERT INTO unrelated VALUES (1)")
+        conn.close()
+
+        await mine.refresh()
+        return mine.summary(1, now=YEAR_2024 + 3600)
+
+    summary = asyncio.run(scenario())
+    assert summary["count"] == 2
+    assert summary["quality"] == 4.0
+
+def test_undated_reviews_stay_out_of_the_trend(tmp_path):
+    stats = ReviewStats(tmp_path / "stats.db")
+    asyncio.run(stats.refresh())
+    stats.add(1, [Review("dated", posted_at=YEAR_2024, quality=4.0), Review("undated", quality=2.0)])
+    summary = stats.summary(1, now=YEAR_2024 + 3600)
+    assert summary["count"] == 2
+    assert summary["trend"] == [(2024, 1, 4.0)]
+    assert summary["latest"] == YEAR_2024
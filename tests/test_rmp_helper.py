@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from rmp_helper import CircuitBreaker, RMPClient, RMPHelper, TTLCache
+
+def test_ttl_cache_expires_and_evicts_least_recently_used(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("rmp_helper.time.monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1 # "b" is now the least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    now[0] += 11
+    assert cache.get("a") is None
+
+def test_ttl_cache_coalesces_concurrent_misses():
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def scenario():
+        cache = TTLCache()
+        results = await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(5)))
+        return cache, results
+
+    cache, results = asyncio.run(scenario())
+    assert results == ["value"] * 5
+    assert calls == 1
+    assert cache.misses == 1 and cache.coalesced == 4
+
+def test_ttl_cache_does_not_cache_failures():
+    async def failing():
+        raise RuntimeError("boom")
+
+    async def scenario():
+        cache = TTLCache()
+        with pytest.raises(RuntimeError):
+            await cache.get_or_load("key", failing)
+        return await cache.get_or_load("key", lambda: asyncio.sleep(0, result="ok"))
+
+    assert asyncio.run(scenario()) == "ok"
+
+def test_ttl_cache_serves_stale_while_refreshing(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("rmp_helper.time.monotonic", lambda: now[0])
+
+    async def scenario():
+        cache = TTLCache()
+        cache.set("key", "old", ttl=10, stale_ttl=60)
+        now[0] += 20
+        refreshed = asyncio.Event()
+
+        async def loader():
+            refreshed.set()
+            return "new"
+
+        served = await cache.get_or_load("key", loader, ttl=10, stale_ttl=60)
+        await refreshed.wait()
+        await asyncio.sleep(0)
+        return served, cache.get("key"), cache.stale_hits
+
+    assert asyncio.run(scenario()) == ("old", "new", 1)
+
+def test_circuit_breaker_opens_then_lets_one_trial_through(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("rmp_helper.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] += 30
+    assert breaker.allow() # the trial
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+def test_cancelled_trial_does_not_wedge_the_breaker(monkeypatch):
+    mode = {"hang": True}
+
+    async def post_once(payload):
+        if mode["hang"]:
+            await asyncio.sleep(10)
+        return {"data": {}}
+
+    async def scenario():
+        client = RMPClient(max_retries=0, failure_threshold=1, reset_timeout=0)
+        client._post_once = post_once
+        client.breaker.record_failure() # open; reset_timeout 0 makes the next request the trial
+        trial = asyncio.create_task(client.post({}))
+        await asyncio.sleep(0.01)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        mode["hang"] = False
+        return await client.post({}), client.breaker.state
+
+    assert asyncio.run(scenario()) == ({"data": {}}, "closed")
+
+def test_uncached_review_pages_skip_the_shared_cache():
+    calls = []
+
+    async def graphql(query, variables):
+        calls.append(variables["cursor"])
+        node = {"id": f"r{len(calls)}", "date": "2025-01-02 03:04:05 +0000 UTC"}
+        return {"data": {"node": {"ratings": {"edges": [{"node": node}], "pageInfo": {"hasNextPage": False}}}}}
+
+    async def scenario():
+        helper = RMPHelper(1, client=RMPClient())
+        helper.client.graphql = graphql
+        cached = await helper.get_reviews_page(count=1)
+        again = await helper.get_reviews_page(count=1)
+        fresh = await helper.get_reviews_page(count=1, cached=False)
+        return cached, again, fresh, len(helper.client.cache._data)
+
+    cached, again, fresh, cache_entries = asyncio.run(scenario())
+    assert [r.id for r in cached[0]] == [r.id for r in again[0]] == ["r1"]
+    assert [r.id for r in fresh[0]] == ["r2"]
+    assert len(calls) == 2 and cache_entries == 1
@@ -0,0 +1,18 @@
+import asyncio
+
+from seen_store import SeenStore
+
+def test_seen_store_evicts_oldest_per_professor_and_persists(tmp_path):
+    path = tmp_path / "seen.db"
+    store = SeenStore(path, max_per_professor=3)
+    for n in range(5):
+        store.add(1, f"r{n}")
+    store.add(2, "other")
+    assert list(store.view(1)) == ["r2", "r3", "r4"]
+    assert store.is_seen(2, "other") and not store.is_seen(2, "r4")
+
+    asyncio.run(store.save())
+    store.close()
+    reopened = SeenStore(path, max_per_professor=3)
+    assert list(reopened.view(1)) == ["r2", "r3", "r4"]
+    assert list(reopened.view(2)) == ["other"]
@@ -0,0 +1,24 @@
+import asyncio
+
+from subscription_store import SubscriptionStore
+
+def test_subscriptions_committed_by_another_connection_are_picked_up(tmp_path):
+    path = tmp_path / "shared.db"
+    mine, other = SubscriptionStore(path), SubscriptionStore(path)
+    assert mine.watched() == {}
+
+    async def scenario():
+        await other.add(10, 1)
+        await other.add(11, 1)
+        await other.add(11, 2)
+        await other.set_high_water({1: 7})
+
+    asyncio.run(scenario())
+    assert mine.watched() == {1: [10, 11], 2: [11]}
+    assert mine.professors(11) == [1, 2]
+    assert mine.high_water(1) == 7
+
+    asyncio.run(other.remove(11, 1))
+    assert mine.watched() == {1: [10], 2: [11]}
+    asyncio.run(other.remove(11))
+    assert mine.channel_ids() == [10]